@@ -0,0 +1,158 @@
+"""
+Admission Control
+Caps concurrent agent runs globally and per user, with a bounded FIFO wait queue
+"""
+from collections import Counter, deque
+from typing import Optional
+import threading
+import time
+
+
+class AdmissionRejected(Exception):
+    """No slot and no room to wait for one"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionTicket:
+    """A place in line for one agent run; release() it when the run ends"""
+
+    def __init__(self, controller: 'AdmissionController', user_id: Optional[str]):
+        self.controller = controller
+        self.user_id = user_id
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.released = False
+
+    @property
+    def waiting(self) -> bool:
+        return not self.granted and not self.released
+
+    @property
+    def position(self) -> int:
+        """1-based place in the wait queue, 0 once admitted"""
+        return self.controller.position(self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until admitted; False on timeout or if released meanwhile"""
+        return self.controller.wait(self, timeout)
+
+    def release(self):
+        self.controller.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    """
+    `max_concurrent` runs at once across all users and `max_per_user` runs
+    (running or queued) per user. Callers beyond the global cap wait in a
+    FIFO queue of at most `max_queue`; anything else is rejected at once so
+    the endpoint can answer 429 without tying up a worker thread.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_per_user: int = 2, max_queue: int = 32):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.cond = threading.Condition()
+        self.queue = deque()
+        self.running = 0
+        self.per_user = Counter()
+        self.admitted_total = 0
+        self.rejected = Counter()
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def enqueue(self, user_id: Optional[str]) -> AdmissionTicket:
+        """Take a slot or a place in the queue; raises AdmissionRejected"""
+        with self.cond:
+            if self.per_user[user_id] >= self.max_per_user:
+                self.rejected['user_limit'] += 1
+                raise AdmissionRejected('user_limit')
+            if self.running >= self.max_concurrent and len(self.queue) >= self.max_queue:
+                self.rejected['queue_full'] += 1
+                raise AdmissionRejected('queue_full')
+            ticket = AdmissionTicket(self, user_id)
+            self.per_user[user_id] += 1
+            self.queue.append(ticket)
+            self._admit()
+            return ticket
+
+    def acquire(self, user_id: Optional[str], timeout: Optional[float] = None) -> AdmissionTicket:
+        """enqueue() and wait; raises AdmissionRejected on timeout"""
+        ticket = self.enqueue(user_id)
+        if not self.admit(ticket, timeout):
+            raise AdmissionRejected('timeout')
+        return ticket
+
+    def admit(self, ticket: AdmissionTicket, timeout: Optional[float] = None) -> bool:
+        """Wait for a queued ticket's slot; gives up its place on timeout"""
+        if ticket.wait(timeout):
+            return True
+        with self.cond:
+            timed_out = ticket.waiting
+            if timed_out:
+                self.rejected['timeout'] += 1
+        ticket.release()
+        return False
+
+    def _admit(self):
+        """Grant free slots to the head of the queue (caller holds cond)"""
+        now = time.monotonic()
+        while self.queue and self.running < self.max_concurrent:
+            ticket = self.queue.popleft()
+            ticket.granted = True
+            self.running += 1
+            self.admitted_total += 1
+            waited = now - ticket.enqueued_at
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.cond.notify_all()
+
+    def wait(self, ticket: AdmissionTicket, timeout: Optional[float] = None) -> bool:
+        with self.cond:
+            self.cond.wait_for(lambda: not ticket.waiting, timeout)
+            return ticket.granted and not ticket.released
+
+    def position(self, ticket: AdmissionTicket) -> int:
+        with self.cond:
+            if not ticket.waiting:
+                return 0
+            return self.queue.index(ticket) + 1
+
+    def release(self, ticket: AdmissionTicket):
+        with self.cond:
+            if ticket.released:
+                return
+            if ticket.granted:
+                self.running -= 1
+            else:
+                self.queue.remove(ticket)
+            ticket.released = True
+            self.per_user[ticket.user_id] -= 1
+            if self.per_user[ticket.user_id] <= 0:
+                del self.per_user[ticket.user_id]
+            self._admit()
+
+    def metrics(self) -> dict:
+        with self.cond:
+            waiting = [time.monotonic() - t.enqueued_at for t in self.queue]
+            return {
+                'running': self.running,
+                'max_concurrent': self.max_concurrent,
+                'queue_depth': len(self.queue),
+                'max_queue': self.max_queue,
+                'admitted_total': self.admitted_total,
+                'rejected_total': dict(self.rejected),
+                'wait_seconds_total': round(self.wait_seconds_total, 3),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.admitted_total, 3) if self.admitted_total else 0.0,
+                'wait_seconds_max': round(self.wait_seconds_max, 3),
+                'oldest_waiting_seconds': round(max(waiting), 3) if waiting else 0.0
+            }
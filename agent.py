@@ -3,9 +3,11 @@ LangGraph Agent Implementation with Real LLM Support
 """
 from langchain_openai import ChatOpenAI
 from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.messages import AIMessage
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt import create_react_agent
 from typing import Generator, Optional
+from contextlib import closing
 import os
 from agentic_flow.scripts.vectara_app import generate_response as agent_generate
 from dotenv import load_dotenv
@@ -18,10 +20,12 @@ class CustomAgent:
     def generate_response(
         self, 
         message: str, 
-        session_key: str
+        session_key: str,
+        stream_mode: Optional[str] = None,
+        cancel=None
         ) -> Generator[str, None, None]:
-        for i in agent_generate(message, session_key):
-            yield i
+        # Vectara already streams token deltas, so every mode is 'delta' here
+        yield from agent_generate(message, session_key, cancel=cancel)
 
 
 class ChatAgent:
@@ -113,7 +117,9 @@ class ChatAgent:
     def generate_response(
         self, 
         message: str, 
-        session_key: str
+        session_key: str,
+        stream_mode: Optional[str] = None,
+        cancel=None
     ) -> Generator[str, None, None]:
         """
         Generate streaming response from the agent
@@ -121,6 +127,11 @@ class ChatAgent:
         Args:
             message: User message
             session_key: Unique session identifier
+            stream_mode: 'delta' yields only the new tokens of the answer,
+                'values' yields the whole last message after every step.
+                Defaults to the 'stream_mode' config key ('delta').
+            cancel: Optional cancel scope; the LangGraph run is closed
+                once it is cancelled.
             
         Yields:
             Streaming response chunks
@@ -130,8 +141,13 @@ class ChatAgent:
                 'thread_id': session_key
             }
         }
+        stream_mode = stream_mode or self.config.get('stream_mode', 'delta')
         
         try:
+            if stream_mode == 'delta':
+                yield from self._stream_deltas(message, config, cancel)
+                return
+            
             # Stream events from the agent
             for events in self.agent.stream(
                 {'messages': [('user', message)]},
@@ -153,6 +169,29 @@ class ChatAgent:
         except Exception as e:
             # Fallback response if agent fails
             yield f"عذراً، حدث خطأ: {str(e)}"
+    
+    def _stream_deltas(self, message: str, config: dict, cancel=None) -> Generator[str, None, None]:
+        """Yield only the new LLM tokens, skipping tool calls and tool output"""
+        # closing() aborts the LangGraph run when the consumer stops reading
+        with closing(self.agent.stream(
+            {'messages': [('user', message)]},
+            config=config,
+            stream_mode='messages'
+        )) as stream:
+            for chunk, metadata in stream:
+                if cancel is not None and cancel.cancelled:
+                    return
+                if not isinstance(chunk, AIMessage):
+                    continue
+                content = chunk.content
+                if isinstance(content, list):
+                    # Content blocks (e.g. Anthropic via OpenRouter)
+                    content = ''.join(
+                        block.get('text', '') if isinstance(block, dict) else str(block)
+                        for block in content
+                    )
+                if content:
+                    yield content
 
 
 # Global agent instance
@@ -1,6 +1,7 @@
 import requests
 import json
 import http.client
+import socket
 import json
 from typing import Optional, Dict, Any
 
@@ -8,20 +9,41 @@ from urllib3 import response
 
 
 
+def _abort_response(response):
+    """
+    Close a streaming response from another thread. response.close() alone
+    neither wakes a read blocked on the socket nor returns until that read
+    does; shutting the socket down ends the read at once.
+    """
+    try:
+        sock = socket.socket(fileno=socket.dup(response.raw.fileno()))
+    except (OSError, ValueError):
+        pass  # already closed
+    else:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+    response.close()
+
+
 class VectaraAPIs:
     """
     A wrapper class for interacting with the Vectara Tools & MCP Server APIs.
     """
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str = "https://api.vectara.io/v2"):
         """
         Initialize the Vectara API wrapper.
 
         Args:
             api_key (str): Your Vectara API key.
+            base_url (str): Vectara REST API root (default: https://api.vectara.io/v2).
         """
         self.api_key = api_key
-        self.base_url = "https://api.vectara.io/v2"
+        self.base_url = base_url.rstrip("/")
 
     # -------------------------
     # Tools
@@ -146,7 +168,7 @@ class VectaraAPIs:
     
 
     def list_servers(self):
-        url = "https://api.vectara.io/v2/tool_servers"
+        url = f"{self.base_url}/tool_servers"
 
         payload = {}
         headers = {
@@ -459,7 +481,7 @@ class VectaraAPIs:
         - Response: The HTTP response from the Vectara API containing session details.
         """
 
-        url = f"https://api.vectara.io/v2/agents/{agent_key}/sessions/{session_key}"
+        url = f"{self.base_url}/agents/{agent_key}/sessions/{session_key}"
 
         headers = {
             "Accept": "application/json",
@@ -469,7 +491,7 @@ class VectaraAPIs:
         return requests.get(url, headers=headers)
 
 
-    def interact_with_agent(self, agent_key: str, session_key: str, message: str, stream_response: bool = False):
+    def interact_with_agent(self, agent_key: str, session_key: str, message: str, stream_response: bool = False, cancel=None):
         """
         Send a message to a Vectara agent inside an existing session.
 
@@ -478,6 +500,8 @@ class VectaraAPIs:
         - session_key (str): The session identifier for the current conversation session.
         - message (str): The text message to send to the agent.
         - stream_response (bool): Whether to stream the response (True) or wait for full output (False).
+        - cancel: Optional cancel scope (see chat_streams.CancelScope); cancelling it
+          closes the streaming response so the agent run is not read to the end.
 
         Returns:
         - Response: The HTTP response from the Vectara API.
@@ -489,7 +513,7 @@ class VectaraAPIs:
             print(f'Create session status: {create_session}')
  
             
-        url = f"https://api.vectara.io/v2/agents/{agent_key}/sessions/{session_key}/events"
+        url = f"{self.base_url}/agents/{agent_key}/sessions/{session_key}/events"
 
         payload = {
             "type": "input_message",
@@ -515,6 +539,8 @@ class VectaraAPIs:
             headers["Accept"] = "text/event-stream"
             payload['stream_response'] = True
             response = requests.post(url, headers=headers, data=json.dumps(payload,ensure_ascii=False), stream=True)
+            if cancel is not None:
+                cancel.on_cancel(lambda: _abort_response(response))
         print(f'Here is the payload: {payload}')
         print("response:       ",response)
         print(f"Response status code: {response.status_code}")
@@ -524,6 +550,8 @@ class VectaraAPIs:
             line_count = 0
             has_error = False
             for line in response.iter_lines(decode_unicode=False):
+                if cancel is not None and cancel.cancelled:
+                    break
                 line = line.decode('utf-8')
                 line_count += 1
                 print(f"Line {line_count}: {line[:100]}")  # Print first 100 chars
@@ -549,4 +577,8 @@ class VectaraAPIs:
                             print(f"Parse error: {e}, Line: {json_str}")
                             continue
         except Exception as e:
-            print("Stream error:", e)
\ No newline at end of file
+            if cancel is None or not cancel.cancelled:
+                print("Stream error:", e)
+        finally:
+            # Also runs when the consumer closes this generator early
+            response.close()
\ No newline at end of file
@@ -21,11 +21,12 @@ vectara_api = VectaraAPIs(api_key=os.getenv('VECTARA_API'))
 
 
 
-def generate_response(message, session_key):
+def generate_response(message, session_key, cancel=None):
     print('entered the generation function')
     for i in vectara_api.interact_with_agent(agent_key='ASK_AML',
                               session_key=session_key,
                               message=message,
-                              stream_response=True):
+                              stream_response=True,
+                              cancel=cancel):
         # print(i.get('content', ''), end='', flush=True)
         yield i.get('content','')
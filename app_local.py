@@ -4,10 +4,17 @@ Modern chatbot interface without Chainlit
 """
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
 from functools import wraps
+from contextlib import closing
 from agent import chat_agent
+from chat_store import get_chat_session_store
+from chat_streams import ChatStreamRegistry, ReplayUnavailable
+from admission import AdmissionController, AdmissionRejected
+from mcp_client import MCPClient
+from reference_cache import ReferenceCache
 import uuid
 import secrets
 import json
+import time
 from datetime import datetime
 import os
 from dotenv import load_dotenv, set_key, find_dotenv
@@ -38,8 +45,52 @@ USERS = {
     }
 }
 
-# In-memory storage for chat history (use database in production)
-chat_sessions = {}
+# Chat history store shared by all workers (CHAT_STORE=sqlite|memory)
+chat_sessions = get_chat_session_store(os.getenv('CHAT_STORE', 'sqlite'))
+
+# Agent runs registered by POST /stream-chat, read by GET /stream-chat/<stream_id>
+chat_streams = ChatStreamRegistry(
+    ttl=float(os.getenv('STREAM_TTL_SECONDS', '60')),
+    max_stream_bytes=int(os.getenv('STREAM_REPLAY_BYTES', str(1024 * 1024))),
+    max_total_bytes=int(os.getenv('STREAM_REPLAY_TOTAL_BYTES', str(64 * 1024 * 1024))),
+    resume_grace=float(os.getenv('STREAM_RESUME_GRACE_SECONDS', '10'))
+)
+
+# Idle seconds between SSE keep-alive comments; writing them is how a
+# disconnected client gets noticed while the agent is busy in a tool call
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15'))
+
+# Admission control for agent runs (each one holds Vectara/MCP/DB capacity)
+admission = AdmissionController(
+    max_concurrent=int(os.getenv('CHAT_MAX_CONCURRENT', '8')),
+    max_per_user=int(os.getenv('CHAT_MAX_PER_USER', '2')),
+    max_queue=int(os.getenv('CHAT_MAX_QUEUE', '32'))
+)
+CHAT_QUEUE_TIMEOUT_SECONDS = float(os.getenv('CHAT_QUEUE_TIMEOUT_SECONDS', '60'))
+# Non-streaming /chat holds a WSGI thread while it waits and cannot report
+# its queue position, so it only waits briefly before getting a 429
+CHAT_SYNC_QUEUE_TIMEOUT_SECONDS = float(os.getenv('CHAT_SYNC_QUEUE_TIMEOUT_SECONDS', '1'))
+
+# One pooled MCP connection for the filter wizard; the handshake happens once
+# per MCP session instead of on every request
+MCP_URL = os.getenv('MCP_URL', " http://localhost:4998/mcp")
+mcp_client = MCPClient(
+    MCP_URL,
+    connect_timeout=float(os.getenv('MCP_CONNECT_TIMEOUT', '5')),
+    read_timeout=float(os.getenv('MCP_READ_TIMEOUT', '30')),
+    pool_size=int(os.getenv('MCP_POOL_SIZE', '10')),
+    artifact_token=os.getenv('MCP_ARTIFACT_TOKEN')
+)
+
+# Wizard reference data (domains, strategies) changes about once a week
+reference_cache = ReferenceCache(
+    ttl=float(os.getenv('REFERENCE_CACHE_TTL_SECONDS', '3600')),
+    stale_ttl=float(os.getenv('REFERENCE_CACHE_STALE_SECONDS', '86400')),
+    max_entries=int(os.getenv('REFERENCE_CACHE_MAX_ENTRIES', '1024'))
+)
+
+# Approximate token budget for the STARTING_DATA_ROWS of the investigator prompt
+STARTING_DATA_TOKEN_BUDGET = int(os.getenv('STARTING_DATA_TOKEN_BUDGET', '1500'))
 
 # Helper Functions
 def load_users():
@@ -150,6 +201,46 @@ def save_settings_to_env(settings):
     if settings.get('api_key'):
         set_key(env_file, 'LLM_API_KEY', settings['api_key'])
 
+def sse_event(data, event=None, raw=False, event_id=None):
+    """Encode one Server-Sent Events frame.
+
+    Data is JSON encoded (unless raw) so newlines and special characters
+    survive the `data:` line. The event id lets a reconnecting EventSource
+    resume through the Last-Event-ID header.
+    """
+    if not raw:
+        data = json.dumps(data, ensure_ascii=False)
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    if event:
+        frame += f"event: {event}\n"
+    return f"{frame}data: {data}\n\n"
+
+def busy_message(lang):
+    """Message shown when no chat slot frees up in time"""
+    return 'الخادم مشغول حالياً، يرجى المحاولة بعد قليل' if lang == 'ar' else 'The server is busy, please try again shortly'
+
+def busy_response(reason):
+    """Fast 429 for requests that could not get a chat slot"""
+    error_msg = busy_message(session.get('language', 'ar'))
+    return jsonify({'error': error_msg, 'reason': reason}), 429, {'Retry-After': '5'}
+
+def queued_events(ticket, timeout=None):
+    """SSE 'queued' events with the caller's queue position until it is admitted"""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while ticket.waiting and (deadline is None or time.monotonic() < deadline):
+        yield sse_event({'position': ticket.position}, event='queued')
+        ticket.wait(1)
+
+def admitted_chunks(ticket, cancel, lang, produce_chunks):
+    """Wait in the admission queue, then stream the agent run holding the slot"""
+    cancel.on_cancel(ticket.release)
+    with ticket:
+        if not admission.admit(ticket, CHAT_QUEUE_TIMEOUT_SECONDS):
+            if not cancel.cancelled:
+                yield busy_message(lang)
+            return
+        yield from produce_chunks()
+
 # Initialize users
 USERS = load_users()
 
@@ -251,10 +342,6 @@ def index():
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
     
-    user_id = session['user_id']
-    if user_id not in chat_sessions:
-        chat_sessions[user_id] = []
-    
     lang = request.args.get('lang', session.get('language', 'ar'))
     session['language'] = lang
     
@@ -280,10 +367,6 @@ def dashboard():
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
     
-    user_id = session['user_id']
-    if user_id not in chat_sessions:
-        chat_sessions[user_id] = []
-    
     lang = request.args.get('lang', session.get('language', 'en'))
     session['language'] = lang
     
@@ -310,39 +393,24 @@ def chat():
         session['session_key'] = session_key
         user_id = session.get('user_id')
         
-        response = ""
-        for chunk in chat_agent.generate_response(message, session_key):
-            if chunk:
-                # Since its the chat endpoint not the stream-chat!
-                response += chunk
+        try:
+            ticket = admission.acquire(user_id or request.remote_addr, CHAT_SYNC_QUEUE_TIMEOUT_SECONDS)
+        except AdmissionRejected as e:
+            return busy_response(e.reason)
+        
+        # Chunks are deltas, so join them once instead of re-copying the
+        # growing answer on every token
+        with ticket:
+            response = "".join(
+                chunk for chunk in chat_agent.generate_response(message, session_key, stream_mode='delta')
+                if chunk
+            )
         
         if user_id:
             if current_session_id:
-                for chat_session in chat_sessions.get(user_id, []):
-                    if chat_session['id'] == current_session_id:
-                        chat_session['messages'].append({
-                            'user': message,
-                            'bot': response,
-                            'timestamp': datetime.now().isoformat()
-                        })
-                        chat_session['updated_at'] = datetime.now().isoformat()
-                        chat_session['title'] = message[:50] + ('...' if len(message) > 50 else '')
-                        break
+                chat_sessions.append_message(user_id, current_session_id, message, response)
             else:
-                new_session = {
-                    'id': str(uuid.uuid4()),
-                    'title': message[:50] + ('...' if len(message) > 50 else ''),
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat(),
-                    'messages': [{
-                        'user': message,
-                        'bot': response,
-                        'timestamp': datetime.now().isoformat()
-                    }]
-                }
-                if user_id not in chat_sessions:
-                    chat_sessions[user_id] = []
-                chat_sessions[user_id].insert(0, new_session)
+                new_session = chat_sessions.create_session(user_id, message, response)
                 current_session_id = new_session['id']
         
         return jsonify({
@@ -358,7 +426,13 @@ def chat():
 
 @app.route('/stream-chat', methods=['POST', 'GET'])
 def stream_chat():
-    """Handle streaming chat messages"""
+    """
+    Handle streaming chat messages
+    
+    POST registers the message, starts the agent and returns a stream id to
+    read from GET /stream-chat/<stream_id>. GET with ?message= streams
+    directly (kept for old clients; long prompts hit URL limits).
+    """
     try:
         from flask import Response, stream_with_context
         
@@ -383,17 +457,45 @@ def stream_chat():
             session_key = session.get('session_key', str(uuid.uuid4()))
             session['session_key'] = session_key
         
+        try:
+            ticket = admission.enqueue(session.get('user_id') or request.remote_addr)
+        except AdmissionRejected as e:
+            return busy_response(e.reason)
+        lang = session.get('language', 'ar')
+        
+        if request.method == 'POST':
+            chat_stream = chat_streams.start(
+                session.get('user_id'),
+                lambda cancel: admitted_chunks(
+                    ticket, cancel, lang,
+                    lambda: chat_agent.generate_response(message, session_key, stream_mode='delta', cancel=cancel)
+                ),
+                ticket=ticket
+            )
+            return jsonify({
+                'stream_id': chat_stream.id,
+                'stream_url': url_for('stream_chat_events', stream_id=chat_stream.id),
+                'session_key': session_key
+            })
+        
         def generate():
-            for chunk in chat_agent.generate_response(message, session_key):
-                if chunk:
-                    # JSON encode the chunk to properly escape newlines and special characters
-                    import json
-                    encoded_chunk = json.dumps(chunk, ensure_ascii=False)
-                    yield f"data: {encoded_chunk}\n\n"
+            event_id = 0
+            with ticket:
+                yield from queued_events(ticket, CHAT_QUEUE_TIMEOUT_SECONDS)
+                if not admission.admit(ticket, 0):
+                    yield sse_event(busy_message(lang), event_id=event_id)
+                    yield sse_event('complete', event='end', raw=True, event_id=event_id + 1)
+                    return
+                # closing() stops the agent when the client disconnects mid-answer
+                with closing(chat_agent.generate_response(message, session_key, stream_mode='delta')) as chunks:
+                    for chunk in chunks:
+                        if chunk:
+                            yield sse_event(chunk, event_id=event_id)
+                            event_id += 1
             
-            yield "event: end\ndata: complete\n\n"
+            yield sse_event('complete', event='end', raw=True, event_id=event_id)
         
-        return Response(
+        response = Response(
             stream_with_context(generate()),
             mimetype='text/event-stream',
             headers={
@@ -401,12 +503,76 @@ def stream_chat():
                 'X-Accel-Buffering': 'no'
             }
         )
+        # Frees the slot even if the client leaves before the body starts
+        response.call_on_close(ticket.release)
+        return response
     
     except Exception as e:
         lang = session.get('language', 'ar')
         error_msg = f'حدث خطأ: {str(e)}' if lang == 'ar' else f'Error: {str(e)}'
         return jsonify({'error': error_msg}), 500
 
+@app.route('/stream-chat/<stream_id>', methods=['GET'])
+def stream_chat_events(stream_id):
+    """
+    Stream the response of a chat registered with POST /stream-chat
+    
+    A reconnect carrying Last-Event-ID (or ?last_event_id=) resumes after
+    that event from the stream's replay buffer instead of re-running the agent.
+    """
+    from flask import stream_with_context
+    
+    chat_stream = chat_streams.get(stream_id, session.get('user_id'))
+    if not chat_stream:
+        return jsonify({'error': 'Stream not found or expired'}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', ''))
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    
+    def generate():
+        event_id = start
+        # The WSGI server closes this generator when the client goes away;
+        # detach() then cancels the run unless the client resumes in time
+        chat_streams.attach(chat_stream)
+        try:
+            if chat_stream.ticket:
+                yield from queued_events(chat_stream.ticket)
+            for item in chat_stream.read(start, heartbeat=STREAM_HEARTBEAT_SECONDS):
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_id, chunk = item
+                yield sse_event(chunk, event_id=event_id)
+                event_id += 1
+            
+            yield sse_event('complete', event='end', raw=True, event_id=event_id)
+        except ReplayUnavailable as e:
+            # Resuming would leave a hole in the answer; tell the client to stop
+            yield sse_event(str(e), event='reset')
+        finally:
+            chat_streams.detach(chat_stream)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@app.route('/stream-chat/<stream_id>', methods=['DELETE'])
+def cancel_stream_chat(stream_id):
+    """Stop a running chat: closes the upstream agent stream and frees its thread"""
+    if chat_streams.cancel(stream_id, session.get('user_id')):
+        return jsonify({'success': True})
+    return jsonify({'error': 'Stream not found or expired'}), 404
+
+@app.route('/api/admission/metrics', methods=['GET'])
+def admission_metrics():
+    """Chat admission metrics: running runs, queue depth, wait times, rejections"""
+    return jsonify(admission.metrics())
+
 @app.route('/new-session', methods=['POST'])
 def new_session():
     """Create new chat session"""
@@ -420,47 +586,29 @@ def new_session():
 def get_history():
     """Get all chat sessions for current user"""
     user_id = session.get('user_id')
-    if not user_id or user_id not in chat_sessions:
+    if not user_id:
         return jsonify({'sessions': []})
     
-    sessions_summary = []
-    for chat_session in chat_sessions[user_id]:
-        sessions_summary.append({
-            'id': chat_session['id'],
-            'title': chat_session['title'],
-            'created_at': chat_session['created_at'],
-            'updated_at': chat_session['updated_at'],
-            'message_count': len(chat_session['messages'])
-        })
-    
-    return jsonify({'sessions': sessions_summary})
+    return jsonify({'sessions': chat_sessions.list_sessions(user_id)})
 
 @app.route('/get-session/<session_id>', methods=['GET'])
 @app.route('/get-session/<session_id>', methods=['GET'])
 def get_session(session_id):
     """Get full session data"""
     user_id = session.get('user_id')
-    if not user_id or user_id not in chat_sessions:
+    chat_session = chat_sessions.get_session(user_id, session_id) if user_id else None
+    if not chat_session:
         return jsonify({'error': 'Session not found'}), 404
     
-    for chat_session in chat_sessions[user_id]:
-        if chat_session['id'] == session_id:
-            return jsonify({'session': chat_session})
-    
-    return jsonify({'error': 'Session not found'}), 404
+    return jsonify({'session': chat_session})
 
 @app.route('/delete-session/<session_id>', methods=['DELETE'])
 @app.route('/delete-session/<session_id>', methods=['DELETE'])
 def delete_session(session_id):
     """Delete a chat session"""
     user_id = session.get('user_id')
-    if not user_id or user_id not in chat_sessions:
-        return jsonify({'error': 'Session not found'}), 404
-    
-    for i, chat_session in enumerate(chat_sessions[user_id]):
-        if chat_session['id'] == session_id:
-            chat_sessions[user_id].pop(i)
-            return jsonify({'success': True, 'message': 'Session deleted'})
+    if user_id and chat_sessions.delete_session(user_id, session_id):
+        return jsonify({'success': True, 'message': 'Session deleted'})
     
     return jsonify({'error': 'Session not found'}), 404
 
@@ -469,8 +617,8 @@ def delete_session(session_id):
 def clear_all_history():
     """Clear all chat history for current user"""
     user_id = session.get('user_id')
-    if user_id and user_id in chat_sessions:
-        chat_sessions[user_id] = []
+    if user_id:
+        chat_sessions.clear_sessions(user_id)
     
     return jsonify({'success': True, 'message': 'All history cleared'})
 
@@ -729,86 +877,46 @@ def upload_background():
         return jsonify({'error': str(e)}), 500
 
 # Filter Wizard API Endpoints
+def load_filter_domains():
+    """Load filter wizard domains from svi_alerts.tdc_domain via MCP"""
+    sql_query = "SELECT domain_id, domain_nm, domain_description_txt FROM svi_alerts.tdc_domain"
+    domains_data = parse_mcp_rows(mcp_client.execute_sql(sql_query, output_format='json'))
+    
+    # Transform data to match frontend format
+    result_list = []
+    for domain in domains_data:
+        result_list.append({
+            'value': domain.get('domain_id', ''),
+            'title': domain.get('domain_nm', ''),
+            'description': domain.get('domain_description_txt', '') if domain.get('domain_description_txt') else 'No description available',
+            'id': domain.get('domain_id', '')
+        })
+    return result_list
+
+def load_filter_strategies(domain_id):
+    """Load filter wizard strategies of a domain from svi_alerts.tdc_strategy via MCP"""
+    sql_query = f"SELECT strategy_id, strategy_nm, strategy_description_txt FROM svi_alerts.tdc_strategy WHERE domain_id={sql_literal(domain_id)}"
+    print(f"🔍 Executing SQL query: {sql_query}")
+    strategies_data = parse_mcp_rows(mcp_client.execute_sql(sql_query, output_format='json'))
+    print(f"🔍 MCP returned {len(strategies_data)} strategies")
+    
+    # Transform data to match frontend format
+    result_list = []
+    for strategy in strategies_data:
+        result_list.append({
+            'value': strategy.get('strategy_id', ''),
+            'title': strategy.get('strategy_nm', ''),
+            'description': strategy.get('strategy_description_txt', '') if strategy.get('strategy_description_txt') else 'No description available',
+            'id': strategy.get('strategy_id', '')
+        })
+    return result_list
+
 @app.route('/api/filter/domains', methods=['GET'])
 def get_filter_domains():
-    """Get all domains for filter wizard from database via MCP"""
+    """Get all domains for filter wizard from database via MCP (cached)"""
     try:
-        import requests
-        
-        MCP_URL = " http://localhost:4998/mcp"
-        
-        def call_execute_sql(sql, req_id=1):
-            payload = {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "method": "tools/call",
-                "params": {
-                    "name": "execute_sql_query",
-                    "arguments": {
-                        "sql_query": sql
-                    }
-                }
-            }
-            r = requests.post(MCP_URL, json=payload, timeout=30)
-            r.raise_for_status()
-            return r.json()
-        
-        # Initialize MCP (if needed)
-        try:
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {}
-            }, timeout=10)
-            
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "method": "notifications/initialized"
-            }, timeout=10)
-        except:
-            pass  # MCP might already be initialized
-        
-        # Execute SQL query via MCP
-        sql_query = "SELECT domain_id, domain_nm, domain_description_txt FROM svi_alerts.tdc_domain"
-        result = call_execute_sql(sql_query, req_id=10)
-        
-        # Parse the result
-        if result and "result" in result and "content" in result["result"]:
-            result_text = result["result"]["content"][0]["text"]
-            
-            # Parse the text result (assuming it's in a parseable format)
-            import json
-            try:
-                # Try to parse as JSON
-                domains_data = json.loads(result_text)
-            except:
-                # If not JSON, try to parse as table format
-                domains_data = []
-                lines = result_text.strip().split('\n')
-                for line in lines[1:]:  # Skip header
-                    if line.strip():
-                        parts = [p.strip() for p in line.split('|')]
-                        if len(parts) >= 3:
-                            domains_data.append({
-                                'domain_id': parts[0],
-                                'domain_nm': parts[1],
-                                'domain_description_txt': parts[2] if len(parts) > 2 else ''
-                            })
-            
-            # Transform data to match frontend format
-            result_list = []
-            for domain in domains_data:
-                result_list.append({
-                    'value': domain.get('domain_id', ''),
-                    'title': domain.get('domain_nm', ''),
-                    'description': domain.get('domain_description_txt', '') if domain.get('domain_description_txt') else 'No description available',
-                    'id': domain.get('domain_id', '')
-                })
-            
-            return jsonify({'success': True, 'domains': result_list})
-        else:
-            return jsonify({'success': False, 'error': 'No data returned from MCP'}), 500
+        domains = reference_cache.get(('domains',), load_filter_domains)
+        return jsonify({'success': True, 'domains': domains})
         
     except Exception as e:
         print(f"Error fetching domains via MCP: {str(e)}")
@@ -818,10 +926,8 @@ def get_filter_domains():
 
 @app.route('/api/filter/strategies', methods=['GET'])
 def get_filter_strategies():
-    """Get strategies for filter wizard Step 2 based on selected domain_id"""
+    """Get strategies for filter wizard Step 2 based on selected domain_id (cached)"""
     try:
-        import requests
-        
         # Get domain_id from query parameters
         domain_id = request.args.get('domain_id')
         print(f"🔍 Received domain_id parameter: {domain_id}")
@@ -830,83 +936,13 @@ def get_filter_strategies():
             print("❌ No domain_id provided!")
             return jsonify({'success': False, 'error': 'domain_id is required'}), 400
         
-        MCP_URL = " http://localhost:4998/mcp"
-        
-        def call_execute_sql(sql, req_id=1):
-            payload = {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "method": "tools/call",
-                "params": {
-                    "name": "execute_sql_query",
-                    "arguments": {
-                        "sql_query": sql
-                    }
-                }
-            }
-            r = requests.post(MCP_URL, json=payload, timeout=30)
-            r.raise_for_status()
-            return r.json()
+        # Only known domains get a cache entry, so arbitrary ids cannot grow the cache
+        domains = reference_cache.get(('domains',), load_filter_domains)
+        if domain_id not in {str(d['value']) for d in domains}:
+            return jsonify({'success': False, 'error': f'Unknown domain_id: {domain_id}'}), 404
         
-        # Initialize MCP (if needed)
-        try:
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {}
-            }, timeout=10)
-            
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "method": "notifications/initialized"
-            }, timeout=10)
-        except:
-            pass  # MCP might already be initialized
-        
-        
-        # Execute SQL query via MCP with domain_id parameter
-        sql_query = f"SELECT strategy_id, strategy_nm, strategy_description_txt FROM svi_alerts.tdc_strategy WHERE domain_id='{domain_id}'"
-        print(f"🔍 Executing SQL query: {sql_query}")
-        result = call_execute_sql(sql_query, req_id=20)
-        print(f"🔍 MCP Result: {result}")
-        
-        # Parse the result
-        if result and "result" in result and "content" in result["result"]:
-            result_text = result["result"]["content"][0]["text"]
-            
-            # Parse the text result
-            import json
-            try:
-                # Try to parse as JSON
-                strategies_data = json.loads(result_text)
-            except:
-                # If not JSON, try to parse as table format
-                strategies_data = []
-                lines = result_text.strip().split('\n')
-                for line in lines[1:]:  # Skip header
-                    if line.strip():
-                        parts = [p.strip() for p in line.split('|')]
-                        if len(parts) >= 3:
-                            strategies_data.append({
-                                'strategy_id': parts[0],
-                                'strategy_nm': parts[1],
-                                'strategy_description_txt': parts[2] if len(parts) > 2 else ''
-                            })
-            
-            # Transform data to match frontend format
-            result_list = []
-            for strategy in strategies_data:
-                result_list.append({
-                    'value': strategy.get('strategy_id', ''),
-                    'title': strategy.get('strategy_nm', ''),
-                    'description': strategy.get('strategy_description_txt', '') if strategy.get('strategy_description_txt') else 'No description available',
-                    'id': strategy.get('strategy_id', '')
-                })
-            
-            return jsonify({'success': True, 'strategies': result_list})
-        else:
-            return jsonify({'success': False, 'error': 'No data returned from MCP'}), 500
+        strategies = reference_cache.get(('strategies', domain_id), lambda: load_filter_strategies(domain_id))
+        return jsonify({'success': True, 'strategies': strategies})
         
     except Exception as e:
         print(f"Error fetching strategies via MCP: {str(e)}")
@@ -914,156 +950,187 @@ def get_filter_strategies():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/filter/cache/invalidate', methods=['POST'])
+@admin_required
+def invalidate_filter_cache():
+    """Drop cached wizard reference data ('domains', 'strategies' or everything)"""
+    data = request.get_json(silent=True) or {}
+    removed = reference_cache.invalidate(data.get('key'))
+    return jsonify({'success': True, 'removed': removed, 'stats': reference_cache.stats()})
+
+def sql_literal(value):
+    """Quote a request value as a SQL string literal"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def parse_mcp_rows(result):
+    """
+    Rows of an execute_sql_query MCP result as a list of dicts
+    
+    Understands the structured 'json' ({columns, types, rows}) and 'columnar'
+    ({columns, types, data}) formats, and falls back to the pipe-delimited
+    text table for servers that only speak that.
+    """
+    if not (result and "result" in result and "content" in result["result"]):
+        raise ValueError('No data returned from MCP')
+    result_text = result["result"]["content"][0]["text"]
+    if result_text.startswith('Error'):
+        raise ValueError(result_text)
+    
+    try:
+        data = json.loads(result_text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and 'columns' in data:
+        columns = data['columns']
+        if 'data' in data:
+            return [dict(zip(columns, values)) for values in zip(*data['data'])]
+        return [dict(zip(columns, values)) for values in data.get('rows', [])]
+    if isinstance(data, list):
+        return data
+    
+    # Parse as table format: first line is header, rest are data rows
+    rows = []
+    lines = result_text.strip().split('\n')
+    if len(lines) > 1:
+        headers = [h.strip() for h in lines[0].split('|')]
+        for line in lines[1:]:
+            if line.strip():
+                values = [v.strip() for v in line.split('|')]
+                if len(values) >= len(headers):
+                    rows.append({header: values[i] for i, header in enumerate(headers)})
+    return rows
+
+def alert_to_option(alert):
+    """Shape an alert row as a wizard option card"""
+    alert_id = alert.get('alert_id', 'N/A')
+    entity_id = alert.get('actionable_entity_id', 'N/A')
+    entity_name = alert.get('actionable_entity_nm', entity_id)
+    case_status = alert.get('case_status', 'N/A')
+    alert_status = alert.get('alert_status_id', 'N/A')
+    
+    # Build description with available info
+    description_parts = []
+    description_parts.append(f"Alert: {alert_id}")
+    if case_status != 'N/A':
+        description_parts.append(f"Case Status: {case_status}")
+    if alert_status != 'N/A':
+        description_parts.append(f"Alert Status: {alert_status}")
+    if entity_id != 'N/A':
+        description_parts.append(f"Entity ID: {entity_id}")
+    
+    # Use entity name as title
+    title = entity_name if entity_name != entity_id else f"Entity {entity_id}"
+    
+    return {
+        'value': alert_id,
+        'title': title,
+        'description': " | ".join(description_parts),
+        'id': alert_id,
+        'entity_id': entity_id,
+        'entity_name': entity_name,
+        'case_status': case_status,
+        'alert_status': alert_status
+    }
+
+# Page size for the alerts step. Pages are requested with max_rows, which
+# the MCP server caps at its AML_MCP_MAX_PAGE_ROWS; one extra row is fetched
+# to detect a next page, so a page holds at most one row less than that
+ALERTS_PAGE_SIZE = 10
+MCP_MAX_ROWS = int(os.getenv('MCP_MAX_ROWS', '200'))
+ALERTS_MAX_PAGE_SIZE = MCP_MAX_ROWS - 1
+
+def alerts_cursor(alert):
+    """Opaque keyset cursor after an alert row: its (alert_id, case_id)"""
+    return json.dumps([alert.get('alert_id'), alert.get('case_id')])
+
 @app.route('/api/filter/alerts', methods=['GET'])
 def get_filter_alerts():
-    """Get alerts for filter wizard Step 3 based on domain_id and strategy_id"""
+    """
+    Get alerts for filter wizard Step 3 based on domain_id and strategy_id
+    
+    Paging is pushed down into SQL: `limit` rows ordered by (alert_id,
+    case_id), which is unique even when an alert has several cases, after
+    `cursor` (the last row of the previous page) or at `page`. The totals
+    (rows, and distinct alerts) come from a separate COUNT query, run
+    alongside the first page.
+    """
     try:
-        import requests
-        
         # Get parameters from query
         domain_id = request.args.get('domain_id')
         strategy_id = request.args.get('strategy_id')
+        cursor = request.args.get('cursor')
+        page = max(request.args.get('page', 1, type=int), 1)
+        limit = min(max(request.args.get('limit', ALERTS_PAGE_SIZE, type=int), 1), ALERTS_MAX_PAGE_SIZE)
         
-        print(f"🔍 Received parameters - domain_id: {domain_id}, strategy_id: {strategy_id}")
+        print(f"🔍 Received parameters - domain_id: {domain_id}, strategy_id: {strategy_id}, cursor: {cursor}, page: {page}, limit: {limit}")
         
         if not domain_id or not strategy_id:
             print("❌ Missing required parameters!")
             return jsonify({'success': False, 'error': 'domain_id and strategy_id are required'}), 400
         
-        MCP_URL = " http://localhost:4998/mcp"
-        
-        def call_execute_sql(sql, req_id=1):
-            payload = {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "method": "tools/call",
-                "params": {
-                    "name": "execute_sql_query",
-                    "arguments": {
-                        "sql_query": sql
-                    }
-                }
-            }
-            r = requests.post(MCP_URL, json=payload, timeout=30)
-            r.raise_for_status()
-            return r.json()
-        
-        # Initialize MCP (if needed)
-        try:
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {}
-            }, timeout=10)
-            
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "method": "notifications/initialized"
-            }, timeout=10)
-        except:
-            pass  # MCP might already be initialized
+        if cursor:
+            try:
+                cursor_alert_id, cursor_case_id = json.loads(cursor)
+            except (ValueError, TypeError):
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
         
-        # Execute specific SQL query via MCP
-        sql_query = f"""
-        SELECT actionable_entity_id, actionable_entity_nm, ta.alert_id, case_status, alert_status_id 
+        alert_filter = f"""
         FROM svi_alerts.tdc_alert ta
         JOIN fdhdata.tm_cases tc 
             ON ta.alert_id = tc.alert_id
-        WHERE ta.domain_id = '{domain_id}'
+        WHERE ta.domain_id = {sql_literal(domain_id)}
           AND alert_status_id = 'ACTIVE'
           AND ta.queue_id IN (
               SELECT queue_id
               FROM svi_alerts.tdc_queue
-              WHERE domain_id = '{domain_id}'
-                AND strategy_id = '{strategy_id}'
+              WHERE domain_id = {sql_literal(domain_id)}
+                AND strategy_id = {sql_literal(strategy_id)}
           )
         """
         
+        if cursor:
+            page_clause = (
+                f"AND (ta.alert_id, tc.case_id) > ({sql_literal(cursor_alert_id)}, {sql_literal(cursor_case_id)})\n"
+                f"        ORDER BY ta.alert_id, tc.case_id\n        LIMIT {limit + 1}"
+            )
+        else:
+            page_clause = f"ORDER BY ta.alert_id, tc.case_id\n        LIMIT {limit + 1} OFFSET {(page - 1) * limit}"
+        sql_query = f"""
+        SELECT actionable_entity_id, actionable_entity_nm, ta.alert_id, tc.case_id, case_status, alert_status_id 
+        {alert_filter.strip()}
+        {page_clause}
+        """
+        
+        # The total only needs counting once; later pages reuse it client-side.
+        # Both queries go in one MCP batch, which the server runs concurrently
+        queries = [sql_query]
+        if not cursor:
+            queries.append(f"SELECT COUNT(*) AS total, COUNT(DISTINCT ta.alert_id) AS alert_total {alert_filter.strip()}")
+        
         print(f"🔍 Executing SQL query: {sql_query}")
-        result = call_execute_sql(sql_query, req_id=30)
-        print(f"🔍 MCP Result received")
+        results = mcp_client.execute_sql_batch(queries, output_format='json', max_rows=limit + 1)
+        alerts_data = parse_mcp_rows(results[0])
+        print(f"✅ Parsed {len(alerts_data)} alerts")
         
-        # Parse the result
-        if result and "result" in result and "content" in result["result"]:
-            result_text = result["result"]["content"][0]["text"]
-            print(f"🔍 Raw result text (first 500 chars): {result_text[:500]}")
-            
-            # Parse the text result as table format
-            import json
-            alerts_data = []
-            
-            try:
-                # Try to parse as JSON first
-                alerts_data = json.loads(result_text)
-                print(f"✅ Parsed as JSON, found {len(alerts_data)} alerts")
-            except:
-                # Parse as table format
-                print("📋 Parsing as table format...")
-                lines = result_text.strip().split('\n')
-                
-                if len(lines) > 1:
-                    # First line is header
-                    headers = [h.strip() for h in lines[0].split('|')]
-                    print(f"📋 Headers: {headers}")
-                    
-                    # Rest are data rows
-                    for line in lines[1:]:
-                        if line.strip():
-                            values = [v.strip() for v in line.split('|')]
-                            if len(values) >= len(headers):
-                                row_dict = {}
-                                for i, header in enumerate(headers):
-                                    row_dict[header] = values[i] if i < len(values) else ''
-                                alerts_data.append(row_dict)
-                    
-                    print(f"✅ Parsed {len(alerts_data)} alerts from table")
-            
-            # Transform data to match frontend format
-            result_list = []
-            if isinstance(alerts_data, list) and len(alerts_data) > 0:
-                for alert in alerts_data[:10]:  # Limit to first 10 for display
-                    alert_id = alert.get('alert_id', 'N/A')
-                    entity_id = alert.get('actionable_entity_id', 'N/A')
-                    entity_name = alert.get('actionable_entity_nm', entity_id)
-                    case_status = alert.get('case_status', 'N/A')
-                    alert_status = alert.get('alert_status_id', 'N/A')
-                    
-                    # Build description with available info
-                    description_parts = []
-                    description_parts.append(f"Alert: {alert_id}")
-                    if case_status != 'N/A':
-                        description_parts.append(f"Case Status: {case_status}")
-                    if alert_status != 'N/A':
-                        description_parts.append(f"Alert Status: {alert_status}")
-                    if entity_id != 'N/A':
-                        description_parts.append(f"Entity ID: {entity_id}")
-                    
-                    description = " | ".join(description_parts)
-                    
-                    # Use entity name as title
-                    title = entity_name if entity_name != entity_id else f"Entity {entity_id}"
-                    
-                    result_list.append({
-                        'value': alert_id,
-                        'title': title,
-                        'description': description,
-                        'id': alert_id,
-                        'entity_id': entity_id,
-                        'entity_name': entity_name,
-                        'case_status': case_status,
-                        'alert_status': alert_status
-                    })
-                
-                print(f"✅ Transformed {len(result_list)} alerts for frontend")
-            
-            return jsonify({
-                'success': True, 
-                'alerts': result_list, 
-                'total': len(alerts_data)
-            })
-        else:
-            return jsonify({'success': False, 'error': 'No data returned from MCP'}), 500
+        has_more = len(alerts_data) > limit
+        alerts_data = alerts_data[:limit]
+        result_list = [alert_to_option(alert) for alert in alerts_data]
+        
+        total = alert_total = None
+        if len(results) > 1:
+            count_rows = parse_mcp_rows(results[1])
+            total = int(count_rows[0]['total']) if count_rows else len(alerts_data)
+            alert_total = int(count_rows[0]['alert_total']) if count_rows else len(alerts_data)
+        
+        return jsonify({
+            'success': True, 
+            'alerts': result_list, 
+            'total': total,
+            'alert_total': alert_total,
+            'limit': limit,
+            'page': page,
+            'next_cursor': alerts_cursor(alerts_data[-1]) if has_more and alerts_data else None
+        })
         
     except Exception as e:
         print(f"Error fetching alerts via MCP: {str(e)}")
@@ -1075,8 +1142,6 @@ def get_filter_alerts():
 def execute_final_query():
     """Execute final query and return investigator prompt with results"""
     try:
-        import requests
-        
         # Get parameters from request body
         data = request.get_json()
         domain_id = data.get('domain_id')
@@ -1088,40 +1153,6 @@ def execute_final_query():
         if not domain_id or not strategy_id or not alert_id:
             return jsonify({'success': False, 'error': 'Missing required parameters'}), 400
         
-        MCP_URL = " http://localhost:4998/mcp"
-        
-        def call_execute_sql(sql, req_id=1):
-            payload = {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "method": "tools/call",
-                "params": {
-                    "name": "execute_sql_query",
-                    "arguments": {
-                        "sql_query": sql
-                    }
-                }
-            }
-            r = requests.post(MCP_URL, json=payload, timeout=30)
-            r.raise_for_status()
-            return r.json()
-        
-        # Initialize MCP
-        try:
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {}
-            }, timeout=10)
-            
-            requests.post(MCP_URL, json={
-                "jsonrpc": "2.0",
-                "method": "notifications/initialized"
-            }, timeout=10)
-        except:
-            pass
-        
         # Build and execute final query
         final_query = f"""SELECT *
 FROM svi_alerts.tdc_alert ta
@@ -1138,7 +1169,8 @@ WHERE ta.domain_id = '{domain_id}'
   )"""
         
         print(f"🔍 Executing query: {final_query}")
-        result = call_execute_sql(final_query, req_id=100)
+        # Compact encoding keeps the rows the investigator prompt starts from within budget
+        result = mcp_client.execute_sql(final_query, output_format='compact', token_budget=STARTING_DATA_TOKEN_BUDGET)
         
         # Parse result
         if result and "result" in result and "content" in result["result"]:
@@ -1151,6 +1183,7 @@ WHERE ta.domain_id = '{domain_id}'
 
 Task:
 You have been provided with STARTING_DATA_ROWS as an initial set of information about alerts and associated cases.
+STARTING_DATA_ROWS is compact JSON: "constant" holds columns with the same value in every row, "same_as" columns repeat another column, "null_columns" are empty, and columns listed in "dictionaries" hold indexes into those value lists.
 
 Instructions:
 1. Treat STARTING_DATA_ROWS as a factual starting point.
@@ -1187,6 +1220,32 @@ Provide a thorough, regulator-ready case narrative that combines the initial que
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/exports/<artifact_id>', methods=['GET'])
+@login_required
+def download_export(artifact_id):
+    """Stream an export made by the agent's export_query_result tool from the MCP server"""
+    from flask import stream_with_context
+
+    try:
+        upstream = mcp_client.open_artifact(artifact_id)
+    except requests.RequestException as e:
+        return jsonify({'success': False, 'error': f'MCP server unavailable: {e}'}), 502
+    if upstream.status_code == 403:
+        upstream.close()
+        return jsonify({'success': False, 'error': 'MCP server refused the export download (check MCP_ARTIFACT_TOKEN)'}), 502
+    if upstream.status_code != 200:
+        upstream.close()
+        return jsonify({'success': False, 'error': 'Export not found or expired'}), 404
+
+    def generate():
+        with closing(upstream):
+            yield from upstream.iter_content(64 * 1024)
+
+    headers = {'Content-Disposition': f'attachment; filename="export-{secure_filename(artifact_id)}.csv.gz"'}
+    if upstream.headers.get('Content-Length'):
+        headers['Content-Length'] = upstream.headers['Content-Length']
+    return Response(stream_with_context(generate()), mimetype='application/gzip', headers=headers)
+
 def hex_to_rgba(hex_color, opacity=1.0):
     """Convert hex color to rgba"""
     hex_color = hex_color.lstrip('#')
@@ -0,0 +1,72 @@
+"""
+Benchmark /stream-chat and /chat: cumulative ('values') vs delta streaming.
+
+Replays a synthetic 2k-token answer through the real Flask routes and reports
+bytes sent on the wire and server CPU time for each mode.
+
+Usage:
+    python bench_stream_chat.py [--tokens 2000] [--runs 5]
+"""
+import argparse
+import time
+
+import app as chat_app
+
+WORD = 'token '
+
+
+class ReplayAgent:
+    """Yields a fixed answer either as deltas or as the growing full text"""
+
+    def __init__(self, tokens, mode):
+        self.tokens = tokens
+        self.mode = mode
+
+    def generate_response(self, message, session_key, stream_mode=None):
+        text = ''
+        for _ in range(self.tokens):
+            text += WORD
+            yield WORD if self.mode == 'delta' else text
+
+
+def run_stream(client, tokens, mode):
+    chat_app.chat_agent = ReplayAgent(tokens, mode)
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    response = client.get('/stream-chat', query_string={'message': 'bench', 'session_id': 'bench'})
+    sent = sum(len(frame) for frame in response.response)
+    return sent, time.process_time() - cpu, time.perf_counter() - wall
+
+
+def run_chat(client, tokens, mode):
+    chat_app.chat_agent = ReplayAgent(tokens, mode)
+    cpu = time.process_time()
+    response = client.post('/chat', json={'message': 'bench'})
+    return len(response.get_data()), time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    original_agent = chat_app.chat_agent
+    client = chat_app.app.test_client()
+    try:
+        print(f"{args.tokens} tokens, best of {args.runs} runs")
+        print(f"{'endpoint':<14}{'mode':<8}{'bytes':>14}{'cpu ms':>10}{'wall ms':>10}")
+        for mode in ('values', 'delta'):
+            results = [run_stream(client, args.tokens, mode) for _ in range(args.runs)]
+            sent, cpu, wall = min(results, key=lambda r: r[1])
+            print(f"{'/stream-chat':<14}{mode:<8}{sent:>14,}{cpu * 1000:>10.1f}{wall * 1000:>10.1f}")
+        for mode in ('values', 'delta'):
+            results = [run_chat(client, args.tokens, mode) for _ in range(args.runs)]
+            sent, cpu = min(results, key=lambda r: r[1])
+            print(f"{'/chat':<14}{mode:<8}{sent:>14,}{cpu * 1000:>10.1f}{'':>10}")
+    finally:
+        chat_app.chat_agent = original_agent
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Chat Session Store
+Persistent chat history shared by every Flask worker
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Literal, Optional
+import os
+import sqlite3
+import threading
+import uuid
+
+
+def make_title(message: str) -> str:
+    """Session title shown in the history sidebar"""
+    return message[:50] + ('...' if len(message) > 50 else '')
+
+
+class ChatSessionStore(ABC):
+    """Abstract base class for chat history backends"""
+
+    @abstractmethod
+    def list_sessions(self, user_id: str) -> list:
+        """Return session summaries for a user, most recently updated first"""
+        pass
+
+    @abstractmethod
+    def get_session(self, user_id: str, session_id: str) -> Optional[dict]:
+        """Return a full session with its messages, or None"""
+        pass
+
+    @abstractmethod
+    def create_session(self, user_id: str, user_message: str, bot_message: str) -> dict:
+        """Create a session holding its first exchange"""
+        pass
+
+    @abstractmethod
+    def append_message(self, user_id: str, session_id: str, user_message: str, bot_message: str) -> bool:
+        """Append one exchange to an existing session"""
+        pass
+
+    @abstractmethod
+    def delete_session(self, user_id: str, session_id: str) -> bool:
+        """Delete one session"""
+        pass
+
+    @abstractmethod
+    def clear_sessions(self, user_id: str) -> None:
+        """Delete every session of a user"""
+        pass
+
+
+class InMemoryChatSessionStore(ChatSessionStore):
+    """Process-local store, indexed by user_id then session_id"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def list_sessions(self, user_id):
+        with self.lock:
+            user_sessions = list(self.sessions.get(user_id, {}).values())
+        user_sessions.sort(key=lambda s: s['updated_at'], reverse=True)
+        return [{
+            'id': s['id'],
+            'title': s['title'],
+            'created_at': s['created_at'],
+            'updated_at': s['updated_at'],
+            'message_count': len(s['messages'])
+        } for s in user_sessions]
+
+    def get_session(self, user_id, session_id):
+        with self.lock:
+            chat_session = self.sessions.get(user_id, {}).get(session_id)
+            return dict(chat_session, messages=list(chat_session['messages'])) if chat_session else None
+
+    def create_session(self, user_id, user_message, bot_message):
+        now = datetime.now().isoformat()
+        chat_session = {
+            'id': str(uuid.uuid4()),
+            'title': make_title(user_message),
+            'created_at': now,
+            'updated_at': now,
+            'messages': [{'user': user_message, 'bot': bot_message, 'timestamp': now}]
+        }
+        with self.lock:
+            self.sessions.setdefault(user_id, {})[chat_session['id']] = chat_session
+        return chat_session
+
+    def append_message(self, user_id, session_id, user_message, bot_message):
+        now = datetime.now().isoformat()
+        with self.lock:
+            chat_session = self.sessions.get(user_id, {}).get(session_id)
+            if not chat_session:
+                return False
+            chat_session['messages'].append({'user': user_message, 'bot': bot_message, 'timestamp': now})
+            chat_session['updated_at'] = now
+            chat_session['title'] = make_title(user_message)
+        return True
+
+    def delete_session(self, user_id, session_id):
+        with self.lock:
+            return self.sessions.get(user_id, {}).pop(session_id, None) is not None
+
+    def clear_sessions(self, user_id):
+        with self.lock:
+            self.sessions.pop(user_id, None)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, session_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_updated
+    ON chat_sessions (user_id, updated_at DESC);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    user_message TEXT NOT NULL,
+    bot_message TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (user_id, session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteChatSessionStore(ChatSessionStore):
+    """
+    SQLite store in WAL mode so several workers can read while one writes.
+    Messages live in their own table and are appended one row at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, opened lazily"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def list_sessions(self, user_id):
+        rows = self._connect().execute(
+            """
+            SELECT session_id, title, created_at, updated_at, message_count
+            FROM chat_sessions
+            WHERE user_id = ?
+            ORDER BY updated_at DESC
+            """,
+            (user_id,)
+        ).fetchall()
+        return [{
+            'id': row['session_id'],
+            'title': row['title'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'message_count': row['message_count']
+        } for row in rows]
+
+    def get_session(self, user_id, session_id):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT title, created_at, updated_at FROM chat_sessions WHERE user_id = ? AND session_id = ?",
+            (user_id, session_id)
+        ).fetchone()
+        if row is None:
+            return None
+        messages = conn.execute(
+            """
+            SELECT user_message, bot_message, timestamp
+            FROM chat_messages
+            WHERE user_id = ? AND session_id = ?
+            ORDER BY seq
+            """,
+            (user_id, session_id)
+        ).fetchall()
+        return {
+            'id': session_id,
+            'title': row['title'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'messages': [{
+                'user': m['user_message'],
+                'bot': m['bot_message'],
+                'timestamp': m['timestamp']
+            } for m in messages]
+        }
+
+    def create_session(self, user_id, user_message, bot_message):
+        now = datetime.now().isoformat()
+        session_id = str(uuid.uuid4())
+        title = make_title(user_message)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO chat_sessions (user_id, session_id, title, created_at, updated_at, message_count)
+                VALUES (?, ?, ?, ?, ?, 1)
+                """,
+                (user_id, session_id, title, now, now)
+            )
+            conn.execute(
+                "INSERT INTO chat_messages VALUES (?, ?, 1, ?, ?, ?)",
+                (user_id, session_id, user_message, bot_message, now)
+            )
+        return {
+            'id': session_id,
+            'title': title,
+            'created_at': now,
+            'updated_at': now,
+            'messages': [{'user': user_message, 'bot': bot_message, 'timestamp': now}]
+        }
+
+    def append_message(self, user_id, session_id, user_message, bot_message):
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            updated = conn.execute(
+                """
+                UPDATE chat_sessions
+                SET message_count = message_count + 1, updated_at = ?, title = ?
+                WHERE user_id = ? AND session_id = ?
+                """,
+                (now, make_title(user_message), user_id, session_id)
+            )
+            if updated.rowcount == 0:
+                return False
+            seq = conn.execute(
+                "SELECT message_count FROM chat_sessions WHERE user_id = ? AND session_id = ?",
+                (user_id, session_id)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO chat_messages VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, session_id, seq, user_message, bot_message, now)
+            )
+        return True
+
+    def delete_session(self, user_id, session_id):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM chat_messages WHERE user_id = ? AND session_id = ?",
+                (user_id, session_id)
+            )
+            deleted = conn.execute(
+                "DELETE FROM chat_sessions WHERE user_id = ? AND session_id = ?",
+                (user_id, session_id)
+            )
+        return deleted.rowcount > 0
+
+    def clear_sessions(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chat_messages WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM chat_sessions WHERE user_id = ?", (user_id,))
+
+
+def get_chat_session_store(type: Literal['sqlite', 'memory'], path: Optional[str] = None) -> ChatSessionStore:
+    if type == 'sqlite':
+        return SQLiteChatSessionStore(path or os.getenv('CHAT_STORE_PATH', 'chat_sessions.db'))
+    elif type == 'memory':
+        return InMemoryChatSessionStore()
+    raise ValueError(f"Unknown chat session store: {type}")
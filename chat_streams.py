@@ -0,0 +1,246 @@
+"""
+Chat Streams
+Agent runs registered by POST /stream-chat and read by GET /stream-chat/<stream_id>
+"""
+from collections import deque
+from itertools import islice
+from typing import Callable, Generator, Iterable, Optional, Tuple
+import secrets
+import threading
+import time
+
+
+class ReplayUnavailable(Exception):
+    """The requested event id has already left the replay buffer"""
+    pass
+
+
+class CancelScope:
+    """
+    Cancellation signal shared with the code producing a stream.
+
+    Producers check `cancelled` between chunks and register callbacks (e.g.
+    closing an upstream HTTP response) to unblock a read that is waiting.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def on_cancel(self, callback: Callable[[], None]):
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancel callback error: {e}")
+
+
+class ChatStream:
+    """
+    Chunks produced by one agent run, readable while the run is going.
+
+    Every chunk gets an increasing event id. Only the newest `max_bytes` of
+    chunks are kept, so a reader can resume from any id still in that
+    window (SSE Last-Event-ID) without re-running the agent.
+    """
+
+    def __init__(self, stream_id: str, owner: Optional[str], max_bytes: int = 1024 * 1024):
+        self.id = stream_id
+        self.owner = owner
+        self.max_bytes = max_bytes
+        self.chunks = deque()
+        self.first_id = 0
+        self.size = 0
+        self.done = False
+        self.claimed = False
+        self.readers = 0
+        self.ticket = None  # admission ticket, while the run waits for a slot
+        self.cancel_scope = CancelScope()
+        self.updated_at = time.monotonic()
+        self.cond = threading.Condition()
+
+    @property
+    def next_id(self) -> int:
+        return self.first_id + len(self.chunks)
+
+    def append(self, chunk: str):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.size += len(chunk.encode('utf-8'))
+            while self.size > self.max_bytes and len(self.chunks) > 1:
+                self.size -= len(self.chunks.popleft().encode('utf-8'))
+                self.first_id += 1
+            self.cond.notify_all()
+
+    def finish(self):
+        with self.cond:
+            self.done = True
+            self.updated_at = time.monotonic()
+            self.cond.notify_all()
+
+    def read(self, start: int = 0, heartbeat: Optional[float] = None) -> Generator[Optional[Tuple[int, str]], None, None]:
+        """
+        Yield (event_id, chunk) from event id `start`, waiting for new chunks
+        until the run ends. Raises ReplayUnavailable if `start` was evicted.
+
+        With `heartbeat`, yields None after that many idle seconds so the
+        caller can write to (and notice the loss of) an idle client.
+        """
+        event_id = start
+        while True:
+            with self.cond:
+                if event_id >= self.next_id and not self.done:
+                    self.cond.wait(heartbeat)
+                if event_id < self.first_id:
+                    raise ReplayUnavailable(f"event {event_id} is no longer buffered")
+                pending = list(islice(self.chunks, event_id - self.first_id, None))
+                done = self.done
+            if not pending and not done:
+                yield None
+                continue
+            for chunk in pending:
+                yield event_id, chunk
+                event_id += 1
+            if done and not pending:
+                return
+
+
+class ChatStreamRegistry:
+    """
+    Process-local registry of chat streams.
+
+    The agent run starts as soon as the stream is registered, so the POST
+    that creates it overlaps with generation instead of delaying the first
+    token. Stream ids expire `ttl` seconds after they were created (if
+    nobody read them) or after their run finished. When buffered chunks of
+    all streams exceed `max_total_bytes`, finished streams are evicted
+    oldest first.
+
+    A run is cancelled when it is stopped explicitly, when its id expires
+    unread, or when its last reader disconnects and nobody resumes it
+    within `resume_grace` seconds.
+
+    Streams live in this process only: with several workers the POST and
+    the GET need sticky routing to the same worker.
+    """
+
+    def __init__(self, ttl: float = 60, max_stream_bytes: int = 1024 * 1024, max_total_bytes: int = 64 * 1024 * 1024,
+                 resume_grace: float = 10):
+        self.ttl = ttl
+        self.max_stream_bytes = max_stream_bytes
+        self.max_total_bytes = max_total_bytes
+        self.resume_grace = resume_grace
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def start(self, owner: Optional[str], produce_chunks: Callable[[CancelScope], Iterable[str]], ticket=None) -> ChatStream:
+        """
+        Register a stream and run `produce_chunks(cancel_scope)` into it on a
+        background thread
+        """
+        self.purge()
+        chat_stream = ChatStream(secrets.token_urlsafe(16), owner, self.max_stream_bytes)
+        chat_stream.ticket = ticket
+        with self.lock:
+            self.streams[chat_stream.id] = chat_stream
+
+        def produce():
+            cancel_scope = chat_stream.cancel_scope
+            chunks = iter(produce_chunks(cancel_scope))
+            try:
+                for chunk in chunks:
+                    if cancel_scope.cancelled:
+                        break
+                    if chunk:
+                        chat_stream.append(chunk)
+            except Exception as e:
+                # Cancel callbacks close upstream connections mid-read
+                if not cancel_scope.cancelled:
+                    print(f"Chat stream {chat_stream.id} failed: {e}")
+            finally:
+                close = getattr(chunks, 'close', None)
+                if close:
+                    close()
+                chat_stream.finish()
+                self.purge()
+
+        threading.Thread(target=produce, name=f"chat-stream-{chat_stream.id}", daemon=True).start()
+        return chat_stream
+
+    def get(self, stream_id: str, owner: Optional[str]) -> Optional[ChatStream]:
+        """Return a live stream owned by `owner`, or None if unknown or expired"""
+        self.purge()
+        with self.lock:
+            chat_stream = self.streams.get(stream_id)
+        if chat_stream is None or chat_stream.owner != owner:
+            return None
+        return chat_stream
+
+    def attach(self, chat_stream: ChatStream):
+        """Count a reader in; pair with detach() when it goes away"""
+        with chat_stream.cond:
+            chat_stream.claimed = True
+            chat_stream.readers += 1
+
+    def detach(self, chat_stream: ChatStream):
+        """Count a reader out; an unfinished run left without readers is
+        cancelled unless someone resumes it within the grace period"""
+        with chat_stream.cond:
+            chat_stream.readers -= 1
+            orphaned = chat_stream.readers == 0 and not chat_stream.done
+        if orphaned:
+            timer = threading.Timer(self.resume_grace, self._cancel_if_orphaned, [chat_stream])
+            timer.daemon = True
+            timer.start()
+
+    def _cancel_if_orphaned(self, chat_stream: ChatStream):
+        with chat_stream.cond:
+            orphaned = chat_stream.readers == 0 and not chat_stream.done
+        if orphaned:
+            chat_stream.cancel_scope.cancel()
+
+    def cancel(self, stream_id: str, owner: Optional[str]) -> bool:
+        """Stop a run now (the user pressed stop)"""
+        chat_stream = self.get(stream_id, owner)
+        if chat_stream is None:
+            return False
+        chat_stream.cancel_scope.cancel()
+        return True
+
+    def _expired(self, chat_stream: ChatStream, now: float) -> bool:
+        return now - chat_stream.updated_at > self.ttl and (chat_stream.done or not chat_stream.claimed)
+
+    def purge(self):
+        """Drop expired streams, then finished ones while over the memory cap"""
+        now = time.monotonic()
+        with self.lock:
+            for stream_id in [s.id for s in self.streams.values() if self._expired(s, now)]:
+                # Nobody came to read it: stop paying for the run
+                self.streams.pop(stream_id).cancel_scope.cancel()
+
+            total = sum(s.size for s in self.streams.values())
+            if total <= self.max_total_bytes:
+                return
+            finished = sorted((s for s in self.streams.values() if s.done), key=lambda s: s.updated_at)
+            for chat_stream in finished:
+                if total <= self.max_total_bytes:
+                    break
+                total -= chat_stream.size
+                del self.streams[chat_stream.id]
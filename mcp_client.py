@@ -0,0 +1,145 @@
+"""
+MCP Client
+Shared JSON-RPC client for the AML MCP server used by the filter wizard
+"""
+from itertools import count
+from typing import List, Optional, Tuple
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class MCPClient:
+    """
+    Keeps one pooled keep-alive connection set to the MCP server and performs
+    the initialize handshake once per MCP session. If the server reports the
+    session as unknown (HTTP 404, or 400 with a session id) the handshake is
+    redone and the call retried once.
+    """
+
+    def __init__(self, url: str, connect_timeout: float = 5, read_timeout: float = 30, pool_size: int = 10,
+                 artifact_token: Optional[str] = None):
+        self.url = url.strip()
+        self.artifact_token = artifact_token
+        self.timeout = (connect_timeout, read_timeout)
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        self.http.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': 'application/json, text/event-stream'
+        })
+        self.ids = count(1)
+        self.lock = threading.Lock()
+        self.initialized = False
+        self.session_id = None
+
+    def _post(self, payload: dict) -> requests.Response:
+        headers = {'Mcp-Session-Id': self.session_id} if self.session_id else None
+        return self.http.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+
+    def _initialize(self):
+        response = self._post({
+            "jsonrpc": "2.0",
+            "id": next(self.ids),
+            "method": "initialize",
+            "params": {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {},
+                "clientInfo": {"name": "chat_product_ui", "version": "1.0.0"}
+            }
+        })
+        response.raise_for_status()
+        self.session_id = response.headers.get('Mcp-Session-Id')
+        self._post({
+            "jsonrpc": "2.0",
+            "method": "notifications/initialized"
+        })
+        self.initialized = True
+
+    def _ensure_initialized(self):
+        if self.initialized:
+            return
+        with self.lock:
+            if not self.initialized:
+                self._initialize()
+
+    def reset(self):
+        """Forget the MCP session so the next call handshakes again"""
+        with self.lock:
+            self.initialized = False
+            self.session_id = None
+
+    def _session_lost(self, response: requests.Response) -> bool:
+        return response.status_code == 404 or (response.status_code == 400 and self.session_id is not None)
+
+    def _send(self, payload):
+        """POST a request (or batch), redoing the handshake once if the session was lost"""
+        self._ensure_initialized()
+        response = self._post(payload)
+        if self._session_lost(response):
+            self.reset()
+            self._ensure_initialized()
+            response = self._post(payload)
+        response.raise_for_status()
+        return response.json()
+
+    def _tool_request(self, name: str, arguments: Optional[dict]) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "id": next(self.ids),
+            "method": "tools/call",
+            "params": {
+                "name": name,
+                "arguments": arguments or {}
+            }
+        }
+
+    def call_tool(self, name: str, arguments: Optional[dict] = None) -> dict:
+        """Call an MCP tool and return the JSON-RPC response"""
+        return self._send(self._tool_request(name, arguments))
+
+    def call_tools(self, calls: List[Tuple[str, Optional[dict]]]) -> List[Optional[dict]]:
+        """
+        Call several MCP tools in one JSON-RPC batch, which the server runs
+        concurrently; returns the responses in the order of `calls`
+        """
+        payload = [self._tool_request(name, arguments) for name, arguments in calls]
+        responses = self._send(payload)
+        by_id = {r.get('id'): r for r in responses if isinstance(r, dict)}
+        return [by_id.get(request['id']) for request in payload]
+
+    def _sql_arguments(self, sql: str, output_format: Optional[str], token_budget: Optional[int] = None,
+                       max_rows: Optional[int] = None) -> dict:
+        arguments = {"sql_query": sql}
+        if output_format:
+            arguments["output_format"] = output_format
+        if token_budget:
+            arguments["token_budget"] = token_budget
+        if max_rows:
+            arguments["max_rows"] = max_rows
+        return arguments
+
+    def execute_sql(self, sql: str, output_format: Optional[str] = None, token_budget: Optional[int] = None) -> dict:
+        """Run execute_sql_query; `output_format` is 'text' (server default), 'json', 'columnar'
+        or 'compact' (LLM prompts, at most about `token_budget` tokens)"""
+        return self.call_tool("execute_sql_query", self._sql_arguments(sql, output_format, token_budget))
+
+    def open_artifact(self, artifact_id: str) -> requests.Response:
+        """Streaming GET of an export_query_result artifact from the MCP server; the caller closes it"""
+        base = self.url.rsplit('/mcp', 1)[0]
+        headers = {'Accept': 'application/gzip'}
+        if self.artifact_token:
+            headers['X-Artifact-Token'] = self.artifact_token
+        return self.http.get(f"{base}/artifacts/{artifact_id}", stream=True, timeout=self.timeout,
+                             headers=headers)
+
+    def execute_sql_batch(self, queries: List[str], output_format: Optional[str] = None,
+                          max_rows: Optional[int] = None) -> List[Optional[dict]]:
+        """Run several execute_sql_query calls in one batch round trip; `max_rows` is the page size
+        (the server returns 20 rows by default, at most its AML_MCP_MAX_PAGE_ROWS)"""
+        return self.call_tools([
+            ("execute_sql_query", self._sql_arguments(sql, output_format, max_rows=max_rows)) for sql in queries
+        ])
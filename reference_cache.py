@@ -0,0 +1,131 @@
+"""
+Reference Data Cache
+In-memory TTL cache with stale-while-revalidate for slow-changing wizard data
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+import threading
+import time
+
+
+class CacheEntry:
+    def __init__(self, value: Any):
+        self.value = value
+        self.loaded_at = time.monotonic()
+        self.refreshing = False
+
+
+class ReferenceCache:
+    """
+    Values are fresh for `ttl` seconds. For `stale_ttl` seconds after that a
+    stale value is still served at once while one background thread reloads
+    it; past that window the caller loads it again. Concurrent misses for
+    the same key share a single load. Loader errors are never cached.
+    At most `max_entries` values are kept, least recently used evicted first.
+    """
+
+    def __init__(self, ttl: float = 3600, stale_ttl: float = 86400, max_entries: int = 1024):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.key_locks = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _store(self, key: Hashable, value: Any):
+        with self.lock:
+            self.entries[key] = CacheEntry(value)
+            self.entries.move_to_end(key)
+            self._prune()
+
+    def _prune(self):
+        """Drop entries past the stale window, then the least recently used (caller holds lock)"""
+        now = time.monotonic()
+        for key in [k for k, e in self.entries.items() if now - e.loaded_at >= self.ttl + self.stale_ttl]:
+            del self.entries[key]
+            self.expired += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        # Locks of keys no longer cached; a held one still guards a load
+        for key in [k for k, l in self.key_locks.items() if k not in self.entries and not l.locked()]:
+            del self.key_locks[key]
+
+    def _touch(self, key: Hashable):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, calling `loader()` when needed"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.loaded_at
+            if age < self.ttl:
+                self.hits += 1
+                self._touch(key)
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._touch(key)
+                self._refresh_in_background(key, entry, loader)
+                return entry.value
+
+        with self._key_lock(key):
+            # Another caller may have loaded it while we waited
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry.loaded_at < self.ttl:
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+            value = loader()
+            self._store(key, value)
+            return value
+
+    def _refresh_in_background(self, key: Hashable, entry: CacheEntry, loader: Callable[[], Any]):
+        with self.lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+
+        def refresh():
+            try:
+                with self._key_lock(key):
+                    self._store(key, loader())
+            except Exception as e:
+                # Keep serving the stale value; the next stale hit retries
+                self.refresh_errors += 1
+                entry.refreshing = False
+                print(f"Reference cache refresh failed for {key}: {e}")
+
+        threading.Thread(target=refresh, name="reference-cache-refresh", daemon=True).start()
+
+    def invalidate(self, prefix: Optional[Hashable] = None) -> int:
+        """Drop every entry, or those whose key starts with `prefix`"""
+        with self.lock:
+            keys = [k for k in self.entries if prefix is None or (isinstance(k, tuple) and k[:1] == (prefix,))]
+            for key in keys:
+                del self.entries[key]
+            self._prune()
+        return len(keys)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refresh_errors': self.refresh_errors,
+            'expired': self.expired,
+            'evictions': self.evictions
+        }
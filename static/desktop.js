@@ -449,6 +449,7 @@ let chatSessions = [];
 
 // Global variables for streaming control
 let activeEventSource = null;
+let activeStreamId = null;
 let isStreaming = false;
 
 // Load chat sessions from localStorage
@@ -599,7 +600,7 @@ function deleteSession(sessionId) {
     }
 }
 
-function sendMessage() {
+async function sendMessage() {
     const input = document.getElementById('messageInput');
     const message = input.value.trim();
 
@@ -639,14 +640,47 @@ function sendMessage() {
     toggleSendButton(true);
     isStreaming = true;
 
-    // Always use streaming for real-time response
-    const url = '/stream-chat?' + new URLSearchParams({
-        message: message,
-        session_id: currentSessionId || ''
-    });
-
     console.log('[Chat] Sending message to session:', currentSessionId);
 
+    // Register the message with a POST (no URL length limit), then stream
+    // the answer; the agent starts on the POST so no time is lost
+    let url;
+    try {
+        const response = await fetch('/stream-chat', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                message: message,
+                session_id: currentSessionId || ''
+            })
+        });
+        const data = await response.json();
+        if (response.status === 429) {
+            // Busy: show the server's message instead of a connection error
+            hideTypingIndicator();
+            toggleSendButton(false);
+            isStreaming = false;
+            addMessageToDOM(data.error, 'bot');
+            conversationHistory.push({ text: data.error, type: 'bot', timestamp: Date.now() });
+            saveCurrentSession();
+            return;
+        }
+        if (!response.ok || !data.stream_url) {
+            throw new Error(data.error || response.statusText);
+        }
+        url = data.stream_url;
+        activeStreamId = data.stream_id;
+    } catch (error) {
+        console.error('Streaming error:', error);
+        hideTypingIndicator();
+        toggleSendButton(false);
+        isStreaming = false;
+        addMessageToDOM('حدث خطأ في الاتصال. يرجى المحاولة مرة أخرى.', 'bot');
+        conversationHistory.push({ text: 'حدث خطأ في الاتصال', type: 'bot', timestamp: Date.now() });
+        saveCurrentSession();
+        return;
+    }
+
     const eventSource = new EventSource(url);
     activeEventSource = eventSource;
 
@@ -754,6 +788,13 @@ function sendMessage() {
     };
 
     eventSource.onerror = function (error) {
+        if (eventSource.readyState === EventSource.CONNECTING) {
+            // Dropped connection: the browser reconnects with Last-Event-ID
+            // and the server resumes from its replay buffer
+            console.warn('[Chat] Stream interrupted, resuming...');
+            return;
+        }
+
         hideTypingIndicator();
         toggleSendButton(false);
         isStreaming = false;
@@ -775,6 +816,28 @@ function sendMessage() {
         saveCurrentSession();
     };
 
+    // Every chat slot is taken: show our place in the queue
+    eventSource.addEventListener('queued', function (event) {
+        const indicator = document.getElementById('typingIndicator');
+        if (!indicator) return;
+        const lang = document.documentElement.lang || 'ar';
+        const trans = (typeof translations !== 'undefined' && translations[lang]) || {};
+        const position = JSON.parse(event.data).position;
+        let label = indicator.querySelector('.queue-position');
+        if (!label) {
+            label = document.createElement('div');
+            label.className = 'queue-position';
+            indicator.querySelector('.message-content').appendChild(label);
+        }
+        label.textContent = (trans.queuedPosition || 'Queue position {position}').replace('{position}', position);
+    });
+
+    // The server could not resume the stream without losing chunks
+    eventSource.addEventListener('reset', function (event) {
+        eventSource.close();
+        eventSource.onerror(event);
+    });
+
     eventSource.addEventListener('end', function (event) {
         eventSource.close();
         toggleSendButton(false);
@@ -822,9 +885,14 @@ function toggleSendButton(showStop) {
 // Handle send button click - either send or stop
 function handleSendButton() {
     if (isStreaming && activeEventSource) {
-        // Stop streaming
+        // Stop streaming, and tell the server to stop the agent run too
         activeEventSource.close();
         activeEventSource = null;
+        if (activeStreamId) {
+            fetch('/stream-chat/' + encodeURIComponent(activeStreamId), { method: 'DELETE' })
+                .catch(error => console.warn('[Chat] Could not cancel stream:', error));
+            activeStreamId = null;
+        }
         isStreaming = false;
         toggleSendButton(false);
         hideTypingIndicator();
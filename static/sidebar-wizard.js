@@ -125,60 +125,22 @@ async function prepareNextStepOptions(currentStep, selectedValue) {
         `;
 
         try {
-            const url = `/api/filter/alerts?domain_id=${selectedFilters.step1}&strategy_id=${selectedValue}`;
-            console.log('📡 Fetching from URL:', url);
-
-            const response = await fetch(url);
-            console.log('📡 Response received:', response.status, response.statusText);
-
-            const data = await response.json();
-            console.log('📡 Data parsed:', data);
-            console.log('📡 data.success:', data.success);
-            console.log('📡 data.alerts:', data.alerts);
-            console.log('📡 data.alerts length:', data.alerts ? data.alerts.length : 'undefined');
+            const data = await fetchAlertsPage(selectedFilters.step1, selectedValue, null);
 
             if (data.success && data.alerts && data.alerts.length > 0) {
                 console.log('✅ Found', data.alerts.length, 'alerts (Total:', data.total, ')');
 
                 // Clear loading message
                 optionsContainer.innerHTML = '';
-
-                // Generate alert cards
-                data.alerts.forEach(alert => {
-                    console.log('Creating card for alert:', alert.title);
-                    const card = document.createElement('div');
-                    card.className = 'filter-option-card';
-                    card.setAttribute('data-value', alert.value);
-                    card.onclick = function () {
-                        selectFilterOption(3, alert.value, this);
-                    };
-
-                    card.innerHTML = `
-                        <div class="option-icon">
-                            <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                                <path d="M10.29 3.86L1.82 18a2 2 0 001.71 3h16.94a2 2 0 001.71-3L13.71 3.86a2 2 0 00-3.42 0z"/>
-                                <line x1="12" y1="9" x2="12" y2="13"/>
-                                <line x1="12" y1="17" x2="12.01" y2="17"/>
-                            </svg>
-                        </div>
-                        <div class="option-content">
-                            <div class="option-title">${alert.title}</div>
-                            <div class="option-desc">${alert.description}</div>
-                        </div>
-                        <div class="option-check">✓</div>
-                    `;
-
-                    optionsContainer.appendChild(card);
+                appendAlertCards(optionsContainer, data.alerts);
+                renderAlertsFooter(optionsContainer, {
+                    domainId: selectedFilters.step1,
+                    strategyId: selectedValue,
+                    shown: data.alerts.length,
+                    total: data.total,
+                    nextCursor: data.next_cursor
                 });
 
-                // Add summary message if there are more alerts
-                if (data.total > data.alerts.length) {
-                    const summary = document.createElement('div');
-                    summary.style.cssText = 'text-align: center; padding: 20px; color: rgba(255, 255, 255, 0.6); font-size: 0.9rem;';
-                    summary.textContent = `Showing ${data.alerts.length} of ${data.total} alerts`;
-                    optionsContainer.appendChild(summary);
-                }
-
                 console.log('✅ All alert cards added to container');
             } else {
                 console.log('⚠️ No alerts found or data.success is false');
@@ -229,6 +191,105 @@ async function prepareNextStepOptions(currentStep, selectedValue) {
     `).join('');
 }
 
+// Fetch one page of alerts; `cursor` is the previous page's next_cursor
+async function fetchAlertsPage(domainId, strategyId, cursor) {
+    const params = new URLSearchParams({ domain_id: domainId, strategy_id: strategyId });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    const url = `/api/filter/alerts?${params}`;
+    console.log('📡 Fetching from URL:', url);
+
+    const response = await fetch(url);
+    console.log('📡 Response received:', response.status, response.statusText);
+
+    const data = await response.json();
+    console.log('📡 Data parsed:', data);
+    return data;
+}
+
+// Add alert option cards to the Step 3 container
+function appendAlertCards(container, alerts) {
+    const footer = container.querySelector('.alerts-footer');
+    alerts.forEach(alert => {
+        console.log('Creating card for alert:', alert.title);
+        const card = document.createElement('div');
+        card.className = 'filter-option-card';
+        card.setAttribute('data-value', alert.value);
+        card.onclick = function () {
+            selectFilterOption(3, alert.value, this);
+        };
+
+        card.innerHTML = `
+            <div class="option-icon">
+                <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                    <path d="M10.29 3.86L1.82 18a2 2 0 001.71 3h16.94a2 2 0 001.71-3L13.71 3.86a2 2 0 00-3.42 0z"/>
+                    <line x1="12" y1="9" x2="12" y2="13"/>
+                    <line x1="12" y1="17" x2="12.01" y2="17"/>
+                </svg>
+            </div>
+            <div class="option-content">
+                <div class="option-title">${alert.title}</div>
+                <div class="option-desc">${alert.description}</div>
+            </div>
+            <div class="option-check">✓</div>
+        `;
+
+        container.insertBefore(card, footer);
+    });
+}
+
+// "Showing X of Y" summary and a "Load more" button while pages remain
+function renderAlertsFooter(container, state) {
+    let footer = container.querySelector('.alerts-footer');
+    if (!footer) {
+        footer = document.createElement('div');
+        footer.className = 'alerts-footer';
+        footer.style.cssText = 'text-align: center; padding: 20px; color: rgba(255, 255, 255, 0.6); font-size: 0.9rem;';
+        container.appendChild(footer);
+    }
+    footer.innerHTML = '';
+
+    if (state.total !== null && state.total > state.shown) {
+        const summary = document.createElement('div');
+        summary.textContent = `Showing ${state.shown} of ${state.total} alerts`;
+        footer.appendChild(summary);
+    }
+
+    if (state.nextCursor) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'wizard-btn wizard-btn-back';
+        button.style.marginTop = '10px';
+        button.textContent = 'Load more';
+        button.onclick = async function () {
+            button.disabled = true;
+            button.textContent = 'Loading...';
+            try {
+                const data = await fetchAlertsPage(state.domainId, state.strategyId, state.nextCursor);
+                if (!data.success) {
+                    throw new Error(data.error || 'Error loading alerts');
+                }
+                appendAlertCards(container, data.alerts);
+                renderAlertsFooter(container, {
+                    ...state,
+                    shown: state.shown + data.alerts.length,
+                    nextCursor: data.next_cursor
+                });
+            } catch (error) {
+                console.error('❌ Error loading more alerts:', error);
+                button.disabled = false;
+                button.textContent = 'Load more';
+            }
+        };
+        footer.appendChild(button);
+    }
+
+    if (!footer.childNodes.length) {
+        footer.remove();
+    }
+}
+
 // Next wizard step
 function nextWizardStep() {
     console.log('🔵 nextWizardStep called, current step:', currentWizardStep);
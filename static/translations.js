@@ -42,6 +42,7 @@ const translations = {
 
         // Status
         typing: 'يكتب...',
+        queuedPosition: 'في الانتظار، ترتيبك {position}',
         noHistory: 'لا توجد محادثات سابقة',
         loading: 'جاري التحميل...',
 
@@ -348,6 +349,7 @@ const translations = {
 
         // Status
         typing: 'Typing...',
+        queuedPosition: 'Waiting in queue, position {position}',
         noHistory: 'No previous conversations',
         loading: 'Loading...',
 
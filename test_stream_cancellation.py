@@ -0,0 +1,201 @@
+"""
+Aborted chat streams must stop their upstream work.
+
+Runs chat streams whose producer reads a slow local SSE upstream (the way
+VectaraAPIs.interact_with_agent reads Vectara), aborts them, and checks that
+thread and socket counts return to their baseline. Also drives
+interact_with_agent itself against a local stand-in for the Vectara agent
+API that stalls mid-stream, so only its cancel handling can end the read.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import http.client
+import os
+import threading
+import time
+
+from agentic_flow.scripts.tools import VectaraAPIs
+from chat_streams import CancelScope, ChatStreamRegistry
+
+STREAMS = 8
+
+
+class DripHandler(BaseHTTPRequestHandler):
+    """Upstream that never finishes: one SSE chunk every 50 ms"""
+
+    def do_POST(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        try:
+            while True:
+                self.wfile.write(b'data: {"content": "token "}\n\n')
+                self.wfile.flush()
+                time.sleep(0.05)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StallingVectaraHandler(BaseHTTPRequestHandler):
+    """Vectara agent API: the session exists, its event stream sends a few chunks and then stalls"""
+
+    def do_GET(self):
+        body = b'{"key": "session"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for _ in range(3):
+            self.wfile.write(b'data: {"type": "streaming_output", "content": "token "}\n\n')
+        # requests reads in 512-byte chunks; pad so the events are not held back
+        self.wfile.write(b': ' + b'x' * 1024 + b'\n\n')
+        self.wfile.flush()
+        # Like an agent busy in a long tool call: nothing more is sent. The
+        # read returns (EOF) once the client closes its end of the connection
+        self.connection.settimeout(30)
+        try:
+            self.rfile.read(1)
+        except OSError:
+            return
+        self.server.client_closed.set()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def upstream_chunks(port, cancel):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('POST', '/events', body=b'{}')
+    response = conn.getresponse()
+    cancel.on_cancel(conn.close)
+    try:
+        for line in response:
+            if line.startswith(b'data:'):
+                yield line[5:].strip().decode('utf-8')
+    finally:
+        conn.close()
+
+
+def socket_count():
+    fd_dir = '/proc/self/fd'
+    count = 0
+    for fd in os.listdir(fd_dir):
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)).startswith('socket:'):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def start_upstream(handler=DripHandler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.client_closed = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_aborted_streams_release_threads_and_sockets():
+    server = start_upstream()
+    port = server.server_address[1]
+    registry = ChatStreamRegistry(ttl=60, resume_grace=0.1)
+    try:
+        base_threads = threading.active_count()
+        base_sockets = socket_count()
+
+        streams = [registry.start('user', lambda cancel: upstream_chunks(port, cancel)) for _ in range(STREAMS)]
+        for chat_stream in streams:
+            registry.attach(chat_stream)
+        assert wait_for(lambda: all(s.next_id > 2 for s in streams))
+        assert threading.active_count() >= base_threads + STREAMS
+
+        # Half disconnect (closed EventSource), half press stop (DELETE)
+        for i, chat_stream in enumerate(streams):
+            registry.detach(chat_stream)
+            if i % 2:
+                registry.cancel(chat_stream.id, 'user')
+
+        assert wait_for(lambda: all(s.done for s in streams))
+        assert wait_for(lambda: threading.active_count() <= base_threads), threading.enumerate()
+        assert wait_for(lambda: socket_count() <= base_sockets), socket_count()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_resumed_stream_is_not_cancelled():
+    server = start_upstream()
+    port = server.server_address[1]
+    registry = ChatStreamRegistry(ttl=60, resume_grace=0.3)
+    try:
+        chat_stream = registry.start('user', lambda cancel: upstream_chunks(port, cancel))
+        registry.attach(chat_stream)
+        registry.detach(chat_stream)
+        # The browser reconnects with Last-Event-ID within the grace period
+        registry.attach(chat_stream)
+        time.sleep(0.5)
+        assert not chat_stream.cancel_scope.cancelled
+        assert not chat_stream.done
+        registry.cancel(chat_stream.id, 'user')
+        assert wait_for(lambda: chat_stream.done)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_interact_with_agent_closes_its_response_on_cancel():
+    server = start_upstream(StallingVectaraHandler)
+    api = VectaraAPIs('test-key', base_url=f'http://127.0.0.1:{server.server_address[1]}/v2')
+    try:
+        base_sockets = socket_count()
+        cancel = CancelScope()
+        chunks = []
+
+        def consume():
+            for chunk in api.interact_with_agent('agent', 'session', 'hello', stream_response=True, cancel=cancel):
+                chunks.append(chunk)
+
+        reader = threading.Thread(target=consume, daemon=True)
+        reader.start()
+        assert wait_for(lambda: len(chunks) == 3)
+        assert wait_for(lambda: socket_count() > base_sockets)
+
+        # The upstream sends nothing more; only the cancel callback can unblock the read
+        started = time.monotonic()
+        cancel.cancel()
+        reader.join(2)
+        assert not reader.is_alive(), 'interact_with_agent kept reading after cancel'
+        assert time.monotonic() - started < 2
+        assert server.client_closed.wait(2), 'upstream connection left open'
+        assert wait_for(lambda: socket_count() <= base_sockets), socket_count()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    test_aborted_streams_release_threads_and_sockets()
+    print("Aborted streams released their threads and sockets")
+    test_resumed_stream_is_not_cancelled()
+    print("Resumed stream kept running")
+    test_interact_with_agent_closes_its_response_on_cancel()
+    print("interact_with_agent closed its upstream response on cancel")
@@ -67,12 +67,16 @@ Schema routing, metadata discovery, and data retrieval must be performed using t
 
 #AVAILABLE TOOL 
 • route_schema
+• find_tables
+• describe_tables
 • get_tables
 • get_table_info
 • get_schema_relationships
 • execute_sql_query
 
 #SQL QUERY GENERATION INSTRUCTIONS
+• Use find_tables with the investigator's question to locate the relevant tables and columns before listing whole schemas with get_tables.
+• Use describe_tables to read the columns and keys of all the tables a query needs in one call, rather than get_table_info once per table.
 • Always retrieve only the minimum required data needed for the investigation task.
 • Never retrieve full tables unless absolutely necessary.
 • Apply maximum possible filtering (WHERE clauses, date ranges, IDs, domain-specific constraints) to limit rows.
@@ -0,0 +1,313 @@
+"""
+Synthetic AML dataset for running DataBase_MCP_Server without sasserver.
+
+Generates one SQLite file per schema (svi_alerts, fdhdata, core, ...) with
+the tables the agent and the filter wizard use, at a configurable scale and
+from a fixed seed, so two runs with the same arguments produce the same
+data. fixture_engine() returns an engine that ATTACHes those files under
+their schema names, so `svi_alerts.tdc_alert` resolves as on Postgres.
+
+Table and column comments live in a `_comments` table in each schema file
+(SQLite has no COMMENT ON); the schema catalog reads them from there.
+
+Usage:
+    python aml_fixture.py [--dir fixtures] [--scale 1] [--seed 7]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+
+# Database -> schemas attached to it, mirroring the two Postgres databases
+FIXTURE_DATABASES = {
+    "SharedServices": ["fdhdata", "svivisualinvestigator", "svi_scorecard", "svidocumentgeneration", "svi_alerts"],
+    "amlcore": ["core"],
+}
+
+
+# Rows per table at scale 1
+BASE_ROWS = {
+    "party": 2_000,
+    "account": 4_000,
+    "transactions": 100_000,
+    "alert": 1_000,
+    "audit_event": 5_000,
+}
+
+
+# schema -> [(table, comment, [(column, type, comment), ...], [extra DDL])]
+TABLES = {
+    "svi_alerts": [
+        ("tdc_domain", "Alert domains (lines of business the alerting covers)", [
+            ("domain_id", "TEXT PRIMARY KEY", "Domain identifier"),
+            ("domain_nm", "TEXT NOT NULL", "Domain name"),
+            ("domain_description_txt", "TEXT", "Domain description"),
+        ], []),
+        ("tdc_strategy", "Alerting strategies (scenario groups) within a domain", [
+            ("strategy_id", "TEXT PRIMARY KEY", "Strategy identifier"),
+            ("domain_id", "TEXT NOT NULL REFERENCES tdc_domain(domain_id)", "Owning domain"),
+            ("strategy_nm", "TEXT NOT NULL", "Strategy name"),
+            ("strategy_description_txt", "TEXT", "Strategy description"),
+        ], []),
+        ("tdc_queue", "Work queues alerts are routed to, per domain and strategy", [
+            ("queue_id", "TEXT PRIMARY KEY", "Queue identifier"),
+            ("domain_id", "TEXT NOT NULL REFERENCES tdc_domain(domain_id)", "Owning domain"),
+            ("strategy_id", "TEXT NOT NULL REFERENCES tdc_strategy(strategy_id)", "Strategy feeding the queue"),
+            ("queue_nm", "TEXT NOT NULL", "Queue name"),
+        ], []),
+        ("tdc_alert", "Triggered AML alerts awaiting or under investigation", [
+            ("alert_id", "TEXT PRIMARY KEY", "Alert identifier"),
+            ("domain_id", "TEXT NOT NULL REFERENCES tdc_domain(domain_id)", "Alert domain"),
+            ("queue_id", "TEXT NOT NULL REFERENCES tdc_queue(queue_id)", "Queue holding the alert"),
+            ("actionable_entity_id", "TEXT NOT NULL", "Party the alert is about (core.party.party_id)"),
+            ("actionable_entity_nm", "TEXT", "Name of the alerted party"),
+            ("alert_status_id", "TEXT NOT NULL", "ACTIVE or CLOSED"),
+            ("score", "REAL", "Alert risk score 0-100"),
+            ("created_dttm", "TEXT NOT NULL", "When the alert was raised"),
+        ], ["CREATE INDEX ix_tdc_alert_queue ON tdc_alert(queue_id)",
+            "CREATE INDEX ix_tdc_alert_domain ON tdc_alert(domain_id, alert_status_id)"]),
+    ],
+    "fdhdata": [
+        ("tm_cases", "Investigation cases opened from transaction monitoring alerts", [
+            ("case_id", "TEXT PRIMARY KEY", "Case identifier"),
+            ("alert_id", "TEXT NOT NULL", "Alert the case was opened for (svi_alerts.tdc_alert.alert_id)"),
+            ("case_status", "TEXT NOT NULL", "OPEN, ESCALATED, SAR_FILED or CLOSED"),
+            ("case_category", "TEXT", "Typology, e.g. structuring or rapid movement of funds"),
+            ("opened_dttm", "TEXT NOT NULL", "When the case was opened"),
+            ("closed_dttm", "TEXT", "When the case was closed"),
+        ], ["CREATE INDEX ix_tm_cases_alert ON tm_cases(alert_id)"]),
+    ],
+    "svi_scorecard": [
+        ("risk_score", "Customer risk scores produced by the scoring models", [
+            ("party_id", "TEXT NOT NULL", "Scored party (core.party.party_id)"),
+            ("model_nm", "TEXT NOT NULL", "Scoring model"),
+            ("score", "REAL NOT NULL", "Risk score 0-100"),
+            ("scored_dttm", "TEXT NOT NULL", "When the score was computed"),
+        ], ["CREATE INDEX ix_risk_score_party ON risk_score(party_id)"]),
+    ],
+    "svidocumentgeneration": [
+        ("case_narrative", "Generated investigation narratives and SAR drafts", [
+            ("narrative_id", "INTEGER PRIMARY KEY", "Narrative identifier"),
+            ("case_id", "TEXT NOT NULL", "Case the narrative belongs to (fdhdata.tm_cases.case_id)"),
+            ("narrative_txt", "TEXT NOT NULL", "Narrative text"),
+            ("created_dttm", "TEXT NOT NULL", "When the narrative was generated"),
+        ], []),
+    ],
+    "svivisualinvestigator": [
+        ("audit_event", "Investigator actions recorded by the Visual Investigator UI", [
+            ("event_id", "INTEGER PRIMARY KEY", "Event identifier"),
+            ("user_id", "TEXT NOT NULL", "Investigator"),
+            ("action_cd", "TEXT NOT NULL", "VIEW, UPDATE, ESCALATE or CLOSE"),
+            ("object_id", "TEXT NOT NULL", "Alert or case acted on"),
+            ("event_dttm", "TEXT NOT NULL", "When the action happened"),
+        ], []),
+    ],
+    "core": [
+        ("party", "Customers and counterparties (individuals and organisations)", [
+            ("party_id", "TEXT PRIMARY KEY", "Party identifier"),
+            ("party_nm", "TEXT NOT NULL", "Party name"),
+            ("party_type_cd", "TEXT NOT NULL", "IND or ORG"),
+            ("country_cd", "TEXT NOT NULL", "Country of residence"),
+            ("risk_rating", "TEXT NOT NULL", "LOW, MEDIUM or HIGH customer risk rating"),
+        ], []),
+        ("account", "Accounts held by parties", [
+            ("account_id", "TEXT PRIMARY KEY", "Account identifier"),
+            ("party_id", "TEXT NOT NULL REFERENCES party(party_id)", "Account holder"),
+            ("account_type_cd", "TEXT NOT NULL", "CURRENT, SAVINGS or CARD"),
+            ("currency_cd", "TEXT NOT NULL", "Account currency"),
+            ("status_cd", "TEXT NOT NULL", "OPEN or CLOSED"),
+            ("opened_dt", "TEXT NOT NULL", "Opening date"),
+        ], ["CREATE INDEX ix_account_party ON account(party_id)"]),
+        ("transactions", "Posted account transactions (wire, cash, card, transfer)", [
+            ("transaction_id", "INTEGER PRIMARY KEY", "Transaction identifier"),
+            ("account_id", "TEXT NOT NULL REFERENCES account(account_id)", "Account debited or credited"),
+            ("counterparty_account_id", "TEXT", "Other side of the transaction, if known"),
+            ("amount", "NUMERIC NOT NULL", "Amount in the transaction currency"),
+            ("currency_cd", "TEXT NOT NULL", "Transaction currency"),
+            ("direction_cd", "TEXT NOT NULL", "IN or OUT"),
+            ("channel_cd", "TEXT NOT NULL", "WIRE, CASH, CARD or TRANSFER"),
+            ("transaction_dttm", "TEXT NOT NULL", "Posting time"),
+        ], ["CREATE INDEX ix_transactions_account ON transactions(account_id, transaction_dttm)"]),
+    ],
+}
+
+
+DOMAINS = [
+    ("RETAIL", "Retail Banking", "Individuals and small businesses"),
+    ("CORP", "Corporate Banking", "Corporate and commercial clients"),
+    ("TRADE", "Trade Finance", "Letters of credit and trade transactions"),
+]
+STRATEGIES = ["Structuring", "Rapid Movement of Funds", "High Risk Geography", "Cash Intensive", "Dormant Reactivation"]
+COUNTRIES = ["SA", "AE", "EG", "GB", "US", "PK", "IN", "TR", "IR", "KY"]
+FIRST_NAMES = ["Ahmed", "Sara", "Omar", "Lina", "Khalid", "Noura", "Faisal", "Maha", "Yousef", "Huda"]
+LAST_NAMES = ["Al-Harbi", "Al-Otaibi", "Haddad", "Mansour", "Saleh", "Farouk", "Nasser", "Karim"]
+ORG_SUFFIXES = ["Trading Co", "Holdings", "General Contracting", "Exchange", "Logistics LLC"]
+START = datetime(2024, 1, 1)
+
+
+def _timestamp(rng: random.Random, days: int = 365) -> str:
+    return (START + timedelta(seconds=rng.randrange(days * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _create(conn: sqlite3.Connection, schema: str):
+    conn.execute("CREATE TABLE _comments (table_name TEXT NOT NULL, column_name TEXT, comment TEXT NOT NULL)")
+    for table, comment, columns, extra in TABLES[schema]:
+        conn.execute(f"CREATE TABLE {table} ({', '.join(f'{c} {t}' for c, t, _ in columns)})")
+        for ddl in extra:
+            conn.execute(ddl)
+        conn.execute("INSERT INTO _comments VALUES (?, NULL, ?)", (table, comment))
+        conn.executemany(
+            "INSERT INTO _comments VALUES (?, ?, ?)",
+            [(table, c, text) for c, _, text in columns],
+        )
+
+
+def generate(directory: str, scale: float = 1, seed: int = 7):
+    """Write the fixture files into `directory`, replacing any that exist."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    rows = {name: max(int(count * scale), 10) for name, count in BASE_ROWS.items()}
+    conns = {}
+    for schemas in FIXTURE_DATABASES.values():
+        for schema in schemas:
+            path = os.path.join(directory, f"{schema}.db")
+            if os.path.exists(path):
+                os.remove(path)
+            conns[schema] = sqlite3.connect(path)
+            _create(conns[schema], schema)
+
+    # core: parties, accounts, transactions
+    parties = []
+    for i in range(rows["party"]):
+        if rng.random() < 0.8:
+            name, kind = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "IND"
+        else:
+            name, kind = f"{rng.choice(LAST_NAMES)} {rng.choice(ORG_SUFFIXES)}", "ORG"
+        parties.append((f"P{i:07d}", name, kind, rng.choice(COUNTRIES), rng.choices(["LOW", "MEDIUM", "HIGH"], [70, 22, 8])[0]))
+    conns["core"].executemany("INSERT INTO party VALUES (?, ?, ?, ?, ?)", parties)
+
+    accounts = [
+        (f"A{i:08d}", rng.choice(parties)[0], rng.choice(["CURRENT", "SAVINGS", "CARD"]),
+         rng.choice(["SAR", "SAR", "SAR", "USD", "AED"]), rng.choices(["OPEN", "CLOSED"], [9, 1])[0],
+         _timestamp(rng, 3000)[:10])
+        for i in range(rows["account"])
+    ]
+    conns["core"].executemany("INSERT INTO account VALUES (?, ?, ?, ?, ?, ?)", accounts)
+
+    def transactions():
+        for i in range(rows["transactions"]):
+            account = rng.choice(accounts)
+            amount = round(rng.lognormvariate(7, 1.5), 2)
+            yield (i + 1, account[0], rng.choice(accounts)[0] if rng.random() < 0.6 else None, amount,
+                   account[3], rng.choice(["IN", "OUT"]), rng.choices(["WIRE", "CASH", "CARD", "TRANSFER"], [2, 2, 5, 4])[0],
+                   _timestamp(rng))
+    conns["core"].executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", transactions())
+
+    # svi_alerts: domains, strategies, queues, alerts
+    alerts_db = conns["svi_alerts"]
+    alerts_db.executemany("INSERT INTO tdc_domain VALUES (?, ?, ?)", DOMAINS)
+    queues = []
+    for domain_id, _, _ in DOMAINS:
+        for j, strategy in enumerate(STRATEGIES):
+            strategy_id = f"{domain_id}_S{j + 1}"
+            alerts_db.execute(
+                "INSERT INTO tdc_strategy VALUES (?, ?, ?, ?)",
+                (strategy_id, domain_id, strategy, f"{strategy} scenarios for {domain_id.lower()} customers"),
+            )
+            for k in range(2):
+                queue = (f"{strategy_id}_Q{k + 1}", domain_id, strategy_id, f"{strategy} L{k + 1}")
+                alerts_db.execute("INSERT INTO tdc_queue VALUES (?, ?, ?, ?)", queue)
+                queues.append(queue)
+
+    alerts = []
+    for i in range(rows["alert"]):
+        queue_id, domain_id, _, _ = rng.choice(queues)
+        party = rng.choice(parties)
+        alerts.append((f"ALR{i:07d}", domain_id, queue_id, party[0], party[1],
+                       rng.choices(["ACTIVE", "CLOSED"], [3, 2])[0], round(rng.uniform(20, 100), 1), _timestamp(rng)))
+    alerts_db.executemany("INSERT INTO tdc_alert VALUES (?, ?, ?, ?, ?, ?, ?, ?)", alerts)
+
+    # fdhdata: a case for most alerts; svidocumentgeneration: narratives for some
+    cases = []
+    for i, alert in enumerate(alerts):
+        if rng.random() < 0.85:
+            opened = alert[7]
+            status = rng.choices(["OPEN", "ESCALATED", "SAR_FILED", "CLOSED"], [5, 2, 1, 2])[0]
+            cases.append((f"C{i:07d}", alert[0], status, rng.choice(STRATEGIES), opened,
+                          _timestamp(rng) if status == "CLOSED" else None))
+    conns["fdhdata"].executemany("INSERT INTO tm_cases VALUES (?, ?, ?, ?, ?, ?)", cases)
+    conns["svidocumentgeneration"].executemany(
+        "INSERT INTO case_narrative (case_id, narrative_txt, created_dttm) VALUES (?, ?, ?)",
+        [(case[0], f"Case {case[0]} opened for alert {case[1]} ({case[3]}). Status: {case[2]}.", case[4])
+         for case in cases if rng.random() < 0.4],
+    )
+
+    # svi_scorecard and svivisualinvestigator
+    conns["svi_scorecard"].executemany(
+        "INSERT INTO risk_score VALUES (?, ?, ?, ?)",
+        [(p[0], model, round(rng.uniform(0, 100), 1), _timestamp(rng))
+         for p in parties for model in ("CRR_V2", "TM_BEHAVIOUR") if rng.random() < 0.7],
+    )
+    conns["svivisualinvestigator"].executemany(
+        "INSERT INTO audit_event (user_id, action_cd, object_id, event_dttm) VALUES (?, ?, ?, ?)",
+        [(f"investigator{rng.randrange(1, 25)}", rng.choice(["VIEW", "UPDATE", "ESCALATE", "CLOSE"]),
+          rng.choice(alerts)[0], _timestamp(rng)) for _ in range(rows["audit_event"])],
+    )
+
+    for conn in conns.values():
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.close()
+    with open(os.path.join(directory, "fixture.json"), "w") as f:
+        json.dump({"scale": scale, "seed": seed, "rows": rows}, f)
+
+
+def ensure_fixture(directory: str, scale: float = 1, seed: int = 7) -> str:
+    """Generate the fixture unless one with the same scale and seed is already there."""
+    try:
+        with open(os.path.join(directory, "fixture.json")) as f:
+            info = json.load(f)
+        if info.get("scale") == scale and info.get("seed") == seed:
+            return directory
+    except (OSError, ValueError):
+        pass
+    generate(directory, scale, seed)
+    return directory
+
+
+def fixture_engine(directory: str, database: str):
+    """Engine for one fixture database with its schemas attached under their names."""
+    schemas = FIXTURE_DATABASES[database]
+    engine = create_engine(
+        f"sqlite:///{os.path.join(directory, database + '.db')}",
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=10,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def attach_schemas(dbapi_connection, connection_record):
+        for schema in schemas:
+            path = os.path.join(directory, f"{schema}.db")
+            dbapi_connection.execute(f"ATTACH DATABASE '{path}' AS {schema}")
+        # Read-only, like the agent's access to Postgres
+        dbapi_connection.execute("PRAGMA query_only = ON")
+
+    return engine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    generate(args.dir, args.scale, args.seed)
+    print(f"Wrote AML fixture (scale {args.scale:g}, seed {args.seed}) to {args.dir}")
@@ -0,0 +1,134 @@
+"""
+On-disk export artifacts for export_query_result.
+
+A large result is streamed batch by batch into a gzip-compressed CSV in
+`directory`, so memory stays bounded by one batch whatever the row count.
+Each artifact has a JSON sidecar with its metadata. Artifacts older than
+`retention` seconds, and the oldest ones once the directory holds more
+than `max_bytes`, are deleted by `cleanup`.
+"""
+import csv
+import gzip
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from typing import Iterable
+
+
+_ARTIFACT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class ArtifactStore:
+    def __init__(self, directory: str, retention: float = 24 * 3600, max_bytes: int = 2 * 1024 ** 3):
+        self.directory = directory
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.removed = 0
+        os.makedirs(directory, exist_ok=True)
+        # Left over by a crash mid-export; nothing is writing them any more
+        for name in os.listdir(directory):
+            if name.endswith(".part"):
+                os.remove(os.path.join(directory, name))
+
+    def path(self, artifact_id: str) -> str | None:
+        """Data file of an artifact, or None if the id is malformed or unknown."""
+        if not _ARTIFACT_ID_RE.match(artifact_id or ""):
+            return None
+        path = os.path.join(self.directory, f"{artifact_id}.csv.gz")
+        return path if os.path.exists(path) else None
+
+    def metadata(self, artifact_id: str) -> dict | None:
+        if self.path(artifact_id) is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{artifact_id}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_csv(self, headers: list[str], batches: Iterable[list[tuple]], metadata: dict) -> dict:
+        """
+        Write `batches` of rows as a new artifact; returns its metadata
+        (artifact_id, filename, rows, bytes, created_at plus `metadata`).
+        Written under a temporary name, so a half-written file is never served.
+        """
+        artifact_id = secrets.token_urlsafe(12)
+        path = os.path.join(self.directory, f"{artifact_id}.csv.gz")
+        partial = path + ".part"
+        rows = 0
+        try:
+            with gzip.open(partial, "wt", encoding="utf-8", newline="", compresslevel=6) as f:
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                for batch in batches:
+                    writer.writerows(batch)
+                    rows += len(batch)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        info = {
+            **metadata,
+            "artifact_id": artifact_id,
+            "filename": f"export-{artifact_id}.csv.gz",
+            "columns": headers,
+            "rows": rows,
+            "bytes": os.path.getsize(path),
+            "created_at": time.time(),
+        }
+        with open(os.path.join(self.directory, f"{artifact_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        return info
+
+    def _artifacts(self) -> list[tuple[float, int, str]]:
+        """(modified time, size, id) of every artifact, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".csv.gz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((stat.st_mtime, stat.st_size, name[: -len(".csv.gz")]))
+        return sorted(found)
+
+    def _remove(self, artifact_id: str):
+        for suffix in (".csv.gz", ".json"):
+            try:
+                os.remove(os.path.join(self.directory, artifact_id + suffix))
+            except FileNotFoundError:
+                pass
+        self.removed += 1
+
+    def cleanup(self) -> int:
+        """Apply the retention policy; returns the number of artifacts removed."""
+        with self.lock:
+            removed = self.removed
+            artifacts = self._artifacts()
+            cutoff = time.time() - self.retention
+            total = sum(size for _, size, _ in artifacts)
+            for mtime, size, artifact_id in artifacts:
+                if mtime >= cutoff and total <= self.max_bytes:
+                    break
+                self._remove(artifact_id)
+                total -= size
+            return self.removed - removed
+
+    def stats(self) -> dict:
+        with self.lock:
+            artifacts = self._artifacts()
+        return {
+            "directory": self.directory,
+            "artifacts": len(artifacts),
+            "bytes": sum(size for _, size, _ in artifacts),
+            "max_bytes": self.max_bytes,
+            "retention_seconds": self.retention,
+            "removed": self.removed,
+        }
@@ -0,0 +1,184 @@
+"""
+Repeatable JSON-RPC benchmark for DataBase_MCP_Server.
+
+By default it generates the synthetic AML fixture (aml_fixture.py) at the
+given scale, starts the server on it (AML_MCP_BACKEND=sqlite) and drives
+/mcp with a fixed, seeded mix of tool calls at the given concurrency. It
+reports per-tool latency and overall throughput. Pass --url to drive a
+server that is already running (e.g. against Postgres) instead.
+
+Usage:
+    python bench_mcp_server.py [--scale 1] [--requests 500] [--concurrency 8] [--seed 7]
+                               [--no-cache] [--url http://localhost:4998/mcp] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# (weight, tool, arguments): roughly the mix an investigation produces
+WORKLOAD = [
+    (3, "route_schema", {"intent": "transaction_analysis"}),
+    (4, "get_tables", {"database_schema": "svi_alerts"}),
+    (2, "get_tables", {"database_schema": "core"}),
+    (4, "get_table_info", {"schema_name": "svi_alerts", "table_name": "tdc_alert"}),
+    (3, "get_table_info", {"schema_name": "core", "table_name": "transactions"}),
+    (2, "get_schema_relationships", {"schema_name": "core"}),
+    (2, "find_join_path", {"from_table": "core.transactions", "to_table": "core.party"}),
+    (2, "find_tables", {"question": "customer risk rating"}),
+    (2, "describe_tables", {"tables": ["core.transactions", "core.account", "core.party"]}),
+    (5, "execute_sql_query", {"sql_query": "SELECT domain_id, domain_nm FROM svi_alerts.tdc_domain"}),
+    (5, "execute_sql_query", {"sql_query": (
+        "SELECT ta.alert_id, ta.actionable_entity_nm, tc.case_status FROM svi_alerts.tdc_alert ta "
+        "JOIN fdhdata.tm_cases tc ON ta.alert_id = tc.alert_id "
+        "WHERE ta.domain_id = 'RETAIL' AND ta.alert_status_id = 'ACTIVE' ORDER BY ta.alert_id"
+    )}),
+    (4, "execute_sql_query", {"sql_query": (
+        "SELECT t.* FROM core.transactions t JOIN core.account a ON a.account_id = t.account_id "
+        "WHERE a.party_id = 'P0000042' ORDER BY t.transaction_dttm DESC"
+    ), "output_format": "json"}),
+    (2, "execute_sql_query", {"sql_query": (
+        "SELECT channel_cd, direction_cd, COUNT(*) AS n, SUM(amount) AS total "
+        "FROM core.transactions GROUP BY channel_cd, direction_cd"
+    )}),
+    (1, "execute_sql_query", {"sql_query": "SELECT * FROM core.transactions", "max_rows": 100}),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def call(url: str, request_id: int, tool: str, arguments: dict) -> tuple[float, bool, int]:
+    payload = json.dumps({
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": tool, "arguments": arguments},
+    }).encode("utf-8")
+    request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        body = response.read()
+    elapsed = time.perf_counter() - start
+    result = json.loads(body).get("result", {})
+    text = "".join(c.get("text", "") for c in result.get("content", []))
+    ok = not result.get("isError") and not text.startswith(("Error", "Access denied"))
+    return elapsed, ok, len(body)
+
+
+def start_server(args) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        AML_MCP_BACKEND="sqlite",
+        AML_MCP_FIXTURE_DIR=args.fixture_dir,
+        AML_MCP_FIXTURE_SCALE=str(args.scale),
+        AML_MCP_PORT=str(port),
+    )
+    if args.no_cache:
+        env["AML_MCP_RESULT_CACHE_TTL_SECONDS"] = "0"
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "DataBase_MCP_Server.py")],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/mcp"
+    deadline = time.monotonic() + 300  # first run generates the fixture
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("MCP server exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/catalog", timeout=2) as response:
+                if json.loads(response.read()).get("loaded"):
+                    return server, url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("MCP server did not become ready")
+
+
+def run(url: str, requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    weights = [w for w, _, _ in WORKLOAD]
+    jobs = [(i + 1, *rng.choices(WORKLOAD, weights)[0][1:]) for i in range(requests)]
+
+    # Warm-up: every call once, not measured
+    for i, (_, tool, arguments) in enumerate(WORKLOAD):
+        call(url, -i - 1, tool, arguments)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda job: (job[1], *call(url, *job)), jobs))
+    wall = time.perf_counter() - start
+
+    by_tool = {}
+    for tool, seconds, ok, size in results:
+        stats = by_tool.setdefault(tool, {"latencies": [], "errors": 0, "bytes": 0})
+        stats["latencies"].append(seconds)
+        stats["errors"] += 0 if ok else 1
+        stats["bytes"] += size
+
+    report = {"requests": requests, "concurrency": concurrency, "seed": seed,
+              "wall_seconds": round(wall, 3), "throughput_rps": round(requests / wall, 1), "tools": {}}
+    for tool, stats in sorted(by_tool.items()):
+        latencies = sorted(stats["latencies"])
+        report["tools"][tool] = {
+            "calls": len(latencies),
+            "errors": stats["errors"],
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p95_ms": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+            "avg_bytes": round(stats["bytes"] / len(latencies)),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Drive an already running server instead of starting one")
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--fixture-dir", default=os.path.join(tempfile.gettempdir(), "aml_mcp_fixture"))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the result cache on the started server")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_server(args)
+    try:
+        report = run(url, args.requests, args.concurrency, args.seed)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(10)
+
+    print(f"{report['requests']} requests, concurrency {report['concurrency']}, seed {report['seed']}: "
+          f"{report['wall_seconds']}s, {report['throughput_rps']} req/s")
+    print(f"{'tool':<26}{'calls':>6}{'errors':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'avg bytes':>11}")
+    for tool, stats in report["tools"].items():
+        print(f"{tool:<26}{stats['calls']:>6}{stats['errors']:>7}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['max_ms']:>10}{stats['avg_bytes']:>11}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Token-budget-aware result encoding for LLM callers (output_format="compact").
+
+Columns that are NULL in every row are listed by name only, columns with
+one value in every row are folded into `constant`, columns repeating an
+earlier column (the join keys of a SELECT *) into `same_as`, and string
+columns with many repeated values are dictionary-encoded when that is
+shorter. As many rows as fit in the token budget are packed; the rest
+are reachable through `next_token`.
+"""
+import json
+from typing import Any, Callable
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _dictionary(values: list) -> list | None:
+    """Distinct values of a string column if indexing into them is shorter than the values."""
+    if not all(v is None or isinstance(v, str) for v in values):
+        return None
+    present = [v for v in values if v is not None]
+    distinct = list(dict.fromkeys(present))
+    if len(distinct) * 2 > len(present):
+        # Mostly unique (names, ids): indexes would only obscure the values
+        return None
+    index = {v: n for n, v in enumerate(distinct)}
+    raw = sum(len(_dumps(v)) for v in present)
+    encoded = len(_dumps(distinct)) + sum(len(str(index[v])) for v in present)
+    return distinct if encoded < raw else None
+
+
+def _encode(headers: list[str], rows: list[list], next_token: str | None) -> str:
+    null_columns, constant, same_as, kept = [], {}, {}, []
+    for i, name in enumerate(headers):
+        values = [r[i] for r in rows]
+        if not rows:
+            kept.append(i)
+        elif all(v is None for v in values):
+            null_columns.append(name)
+        elif len(rows) > 1 and all(v == values[0] for v in values):
+            constant[name] = values[0]
+        else:
+            twin = next((j for j in kept if len(rows) > 1 and all(r[j] == r[i] for r in rows)), None)
+            if twin is None:
+                kept.append(i)
+            else:
+                same_as[name] = headers[twin]
+
+    dictionaries = {}
+    columns = []
+    for i in kept:
+        distinct = _dictionary([r[i] for r in rows])
+        if distinct is not None:
+            dictionaries[headers[i]] = distinct
+        columns.append((i, {v: n for n, v in enumerate(distinct)} if distinct else None))
+
+    result = {"columns": [headers[i] for i, _ in columns]}
+    result["rows"] = [
+        [r[i] if index is None or r[i] is None else index[r[i]] for i, index in columns]
+        for r in rows
+    ]
+    if constant:
+        result["constant"] = constant
+    if same_as:
+        result["same_as"] = same_as
+    if null_columns:
+        result["null_columns"] = null_columns
+    if dictionaries:
+        result["dictionaries"] = dictionaries
+        result["note"] = "values of columns in dictionaries are indexes into dictionaries[column]"
+    if next_token:
+        result["next_token"] = next_token
+    return _dumps(result)
+
+
+def encode_compact(
+    headers: list[str],
+    rows: list[list],
+    token_budget: int,
+    next_token: Callable[[int], str | None] = lambda n: None,
+) -> tuple[str, int]:
+    """
+    Encode the longest prefix of `rows` (JSON-safe values) that fits in
+    `token_budget`, at least one row. `next_token(n)` gives the
+    continuation token after `n` rows, or None when there are no more.
+    Returns the encoded text and the number of rows packed.
+    """
+    if not rows:
+        return _encode(headers, rows, next_token(0)), 0
+
+    def encode(n: int) -> str:
+        return _encode(headers, rows[:n], next_token(n))
+
+    low, high = 1, len(rows)
+    best = encode(high)
+    if estimate_tokens(best) <= token_budget:
+        return best, high
+    best = encode(low)
+    # Largest n whose encoding fits; folding and dictionaries make size
+    # grow almost monotonically with n, which is all the search needs
+    while low < high - 1:
+        mid = (low + high) // 2
+        text = encode(mid)
+        if estimate_tokens(text) <= token_budget:
+            low, best = mid, text
+        else:
+            high = mid
+    return best, low
@@ -0,0 +1,97 @@
+"""
+In-process joins for queries that span the amlcore and SharedServices
+databases (execute_federated_query).
+
+Each named subquery runs on its own database; `plan_joins` checks how
+their results are joined and `hash_join` joins them, building a hash
+table on the new subquery's rows and probing it with the rows joined so
+far, in their order. Output columns are named "<subquery>.<column>".
+"""
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+
+JOIN_TYPES = ("inner", "left")
+
+
+class Join(NamedTuple):
+    left: str    # "<subquery>.<column>" of a subquery joined earlier
+    right: str   # "<subquery>.<column>" of the subquery this join adds
+    how: str
+
+
+def _split_column(ref: str, names: list[str]) -> tuple[str, str]:
+    name, _, column = str(ref).partition(".")
+    if not column or name not in names:
+        raise ValueError(f"join column '{ref}' must be <subquery name>.<column>, with one of: {', '.join(names)}")
+    return name, column
+
+
+def plan_joins(names: list[str], joins: list[dict]) -> list[Join]:
+    """
+    Validate `joins` ({"left", "right", "type"}) for subqueries `names`: the
+    first subquery starts the result and each join adds one more, matching
+    one of its columns to a column already in the result.
+    """
+    if len(set(names)) != len(names):
+        raise ValueError("subquery names must be unique.")
+    if len(joins) != len(names) - 1:
+        raise ValueError(f"{len(names)} subqueries need {len(names) - 1} joins, got {len(joins)}.")
+
+    joined = {names[0]}
+    planned = []
+    for join in joins:
+        how = (join.get("type") or "inner").lower()
+        if how not in JOIN_TYPES:
+            raise ValueError(f"join type must be one of: {', '.join(JOIN_TYPES)}.")
+        left, right = _split_column(join.get("left"), names), _split_column(join.get("right"), names)
+        if right[0] in joined and left[0] not in joined:
+            left, right = right, left
+        if left[0] not in joined or right[0] in joined:
+            raise ValueError(
+                f"join {join.get('left')} = {join.get('right')} must match a subquery already joined "
+                "with one that is not yet joined, in the order of the subqueries."
+            )
+        joined.add(right[0])
+        planned.append(Join(".".join(left), ".".join(right), how))
+    return planned
+
+
+def _key(value: Any) -> Any:
+    """Hash key for a join value: numbers compare by value across int/Decimal."""
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return Decimal(str(value))
+    return value
+
+
+def hash_join(
+    left_headers: list[str],
+    left_rows: list[tuple],
+    right_headers: list[str],
+    right_rows: list[tuple],
+    join: Join,
+    limit: int,
+) -> tuple[list[tuple], bool]:
+    """
+    Join two results on `join`; NULL keys never match. Stops after `limit`
+    output rows; returns (rows, True if there were more).
+    """
+    li = left_headers.index(join.left)
+    ri = right_headers.index(join.right)
+
+    table = {}
+    for row in right_rows:
+        if row[ri] is not None:
+            table.setdefault(_key(row[ri]), []).append(row)
+
+    empty = (None,) * len(right_headers)
+    out = []
+    for row in left_rows:
+        matches = table.get(_key(row[li]), ()) if row[li] is not None else ()
+        if not matches and join.how == "left":
+            matches = (empty,)
+        for match in matches:
+            if len(out) == limit:
+                return out, True
+            out.append(row + match)
+    return out, False
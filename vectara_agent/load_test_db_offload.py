@@ -0,0 +1,106 @@
+"""
+Load test: one slow query must not stall other MCP tool calls.
+
+Against a running DataBase_MCP_Server, measures the latency of quick tool
+calls (route_schema, which never touches Postgres, and get_tables) on their
+own, then again while a 10-second `pg_sleep` query is in flight. With the
+DB work offloaded from the event loop the two sets of numbers should match;
+before, every call during the slow query waited for it to finish.
+
+Usage:
+    python load_test_db_offload.py [--url http://localhost:4998/mcp] [--sleep 10] [--calls 40]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+QUICK_CALLS = [
+    ("route_schema", {"intent": "alert_investigation"}),
+    ("get_tables", {"database_schema": "svi_alerts"}),
+]
+
+
+def call_tool(url, name, arguments, timeout=60):
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments},
+    }
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def timed_call(url, name, arguments):
+    start = time.perf_counter()
+    call_tool(url, name, arguments)
+    return name, time.perf_counter() - start
+
+
+def quick_latencies(url, calls, workers=4):
+    jobs = [QUICK_CALLS[i % len(QUICK_CALLS)] for i in range(calls)]
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(lambda job: timed_call(url, *job), jobs))
+    by_tool = {}
+    for name, seconds in results:
+        by_tool.setdefault(name, []).append(seconds)
+    return by_tool
+
+
+def report(label, by_tool):
+    print(label)
+    for name, samples in by_tool.items():
+        samples.sort()
+        p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+        print(f"  {name:<14} p50 {statistics.median(samples) * 1000:8.1f} ms   "
+              f"p95 {p95 * 1000:8.1f} ms   max {samples[-1] * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:4998/mcp")
+    parser.add_argument("--sleep", type=float, default=10)
+    parser.add_argument("--calls", type=int, default=40)
+    args = parser.parse_args()
+
+    # Warm the connection pools so the baseline excludes first-connect cost
+    quick_latencies(args.url, len(QUICK_CALLS))
+    baseline = quick_latencies(args.url, args.calls)
+    report("Baseline", baseline)
+
+    slow_sql = f"SELECT pg_sleep({args.sleep}) FROM svi_alerts.tdc_domain LIMIT 1"
+    slow = {}
+
+    def run_slow():
+        slow["seconds"] = timed_call(args.url, "execute_sql_query", {"sql_query": slow_sql})[1]
+
+    slow_thread = threading.Thread(target=run_slow)
+    slow_thread.start()
+    time.sleep(0.5)  # let the slow query reach Postgres first
+    loaded = quick_latencies(args.url, args.calls)
+    still_running = slow_thread.is_alive()
+    slow_thread.join()
+    report(f"During a {args.sleep:g}s query", loaded)
+    print(f"Slow query took {slow['seconds']:.1f}s")
+
+    worst = max(max(samples) for samples in loaded.values())
+    if not still_running:
+        print("Note: the slow query finished before the quick calls did; raise --sleep")
+    elif worst < args.sleep / 2:
+        print("OK: quick calls were not held up by the slow query")
+    else:
+        print(f"FAIL: a quick call took {worst:.1f}s while the slow query ran")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
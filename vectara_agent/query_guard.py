@@ -0,0 +1,161 @@
+"""
+Statement timeout and EXPLAIN-based cost guard for agent-written SQL.
+
+Every execute_sql_query runs in a transaction with a local
+statement_timeout. Before it runs on Postgres, the (already paged) query is planned
+with EXPLAIN and rejected if the planner's total cost or the estimated
+size of its result is over the configured limits. The error text says
+why and where the rows come from, so the LLM can rewrite the query.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import exc, text
+
+
+# SQLSTATE query_canceled, raised when statement_timeout fires
+_QUERY_CANCELED = "57014"
+
+
+class QueryRejected(Exception):
+    """The planner's estimate is over the guard's limits."""
+
+
+class QueryTimedOut(Exception):
+    """The statement was cancelled by statement_timeout."""
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _describe_node(node: dict) -> str:
+    name = node.get("Node Type", "?")
+    relation = node.get("Relation Name")
+    if relation:
+        schema = node.get("Schema")
+        name += f" on {schema}.{relation}" if schema else f" on {relation}"
+    return f"{name} (~{node.get('Plan Rows', 0):,.0f} rows)"
+
+
+class QueryGuard:
+    """
+    `statement_timeout` in seconds (0 = no timeout); `max_cost` and
+    `max_rows` are planner estimates (0 = that check is off). With
+    `explain` False no EXPLAIN is run and only the timeout applies.
+    """
+
+    def __init__(self, statement_timeout: float = 30, explain: bool = True, max_cost: float = 0, max_rows: float = 0):
+        self.statement_timeout = statement_timeout
+        self.explain = explain and (max_cost > 0 or max_rows > 0)
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    @contextmanager
+    def statement_limits(self, conn):
+        """
+        Apply the statement timeout to the statements run on `conn` inside the
+        block. Postgres gets a transaction-local statement_timeout; SQLite
+        (the local fixture backend) is interrupted by a progress handler.
+        """
+        if self.statement_timeout <= 0:
+            yield
+            return
+        if conn.dialect.name == "postgresql":
+            conn.execute(
+                text("SELECT set_config('statement_timeout', :ms, true)"),
+                {"ms": str(int(self.statement_timeout * 1000))},
+            )
+            yield
+            return
+        if conn.dialect.name == "sqlite":
+            deadline = time.monotonic() + self.statement_timeout
+            raw = conn.connection.driver_connection
+            raw.set_progress_handler(lambda: time.monotonic() > deadline, 10_000)
+            try:
+                yield
+            finally:
+                raw.set_progress_handler(None, 0)
+            return
+        yield
+
+    def check(self, conn, sql: str):
+        """EXPLAIN `sql` on `conn`; raises QueryRejected if it is over the limits."""
+        if not self.explain or conn.dialect.name != "postgresql":
+            return
+        self._count("explain_checks")
+        try:
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        except exc.DBAPIError:
+            # The query itself would fail the same way (syntax, missing table, ...)
+            self._count("explain_errors")
+            raise
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+
+        cost = root.get("Total Cost", 0)
+        # Under the paging LIMIT, the child's estimate is the query's full result size
+        result_node = root["Plans"][0] if root.get("Node Type") == "Limit" and root.get("Plans") else root
+        rows = result_node.get("Plan Rows", 0)
+
+        reasons = []
+        if self.max_cost and cost > self.max_cost:
+            self._count("rejected_cost")
+            reasons.append(f"estimated cost {cost:,.0f} exceeds the limit of {self.max_cost:,.0f}")
+        if self.max_rows and rows > self.max_rows:
+            self._count("rejected_rows")
+            reasons.append(f"estimated result of {rows:,.0f} rows exceeds the limit of {self.max_rows:,.0f}")
+        if not reasons:
+            return
+
+        self._count("rejected")
+        biggest = sorted(_plan_nodes(root), key=lambda n: n.get("Plan Rows", 0), reverse=True)[:3]
+        raise QueryRejected(
+            f"query rejected before running: {'; '.join(reasons)}. "
+            f"Largest plan steps: {', '.join(_describe_node(n) for n in biggest)}. "
+            "Add join conditions between every joined table, filter with WHERE on key columns, "
+            "or aggregate (COUNT/GROUP BY) instead of returning raw rows."
+        )
+
+    def translate_error(self, error: Exception) -> Exception:
+        """QueryTimedOut for a statement_timeout cancellation, else `error` unchanged."""
+        if isinstance(error, exc.DBAPIError) and (
+            getattr(error.orig, "pgcode", None) == _QUERY_CANCELED
+            # SQLite, aborted by the progress handler
+            or str(error.orig) == "interrupted"
+        ):
+            self._count("timeouts")
+            return QueryTimedOut(
+                f"query cancelled after the {self.statement_timeout:g}s statement timeout. "
+                "Narrow it with WHERE filters on key columns, avoid joins without conditions, "
+                "or aggregate instead of returning raw rows."
+            )
+        return error
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+        return {
+            "statement_timeout_seconds": self.statement_timeout,
+            "explain": self.explain,
+            "max_cost": self.max_cost,
+            "max_rows": self.max_rows,
+            "explain_checks": counters.get("explain_checks", 0),
+            "explain_errors": counters.get("explain_errors", 0),
+            "rejected": counters.get("rejected", 0),
+            "rejected_cost": counters.get("rejected_cost", 0),
+            "rejected_rows": counters.get("rejected_rows", 0),
+            "timeouts": counters.get("timeouts", 0),
+        }
@@ -0,0 +1,96 @@
+"""
+Bounded LRU cache for execute_sql_query results.
+
+Entries are keyed by the target database and the normalized SQL text, live
+for `ttl` seconds and are evicted least-recently-used first once the cache
+holds more than `max_bytes` (an estimate of the rows' size in memory).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+def estimate_size(headers: list[str], rows: list[tuple]) -> int:
+    """Rough bytes held by a result: text length of every value plus per-value overhead."""
+    size = sum(len(h) for h in headers) + 64
+    for row in rows:
+        size += 56 + sum(16 + (len(v) if isinstance(v, (str, bytes)) else 8) for v in row)
+    return size
+
+
+class ResultCache:
+    """Thread-safe; `get` and `put` may be called from the DB worker threads."""
+
+    def __init__(self, ttl: float = 60, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if time.monotonic() >= expires_at:
+                del self.entries[key]
+                self.bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int):
+        if size > self.max_bytes:
+            # Would evict everything else and still not fit
+            self.rejected += 1
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self.entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> int:
+        with self.lock:
+            removed = len(self.entries)
+            self.entries.clear()
+            self.bytes = 0
+        return removed
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "rejected_too_large": self.rejected,
+            }
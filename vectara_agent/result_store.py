@@ -0,0 +1,227 @@
+"""
+Session-scoped result handles (store_query_result, read_result, aggregate_result).
+
+A stored result keeps every row of a query (up to a row cap) in memory
+under a short random handle, visible only to the MCP session that stored
+it. Results live for `ttl` seconds after their last use and are evicted
+least-recently-used first once the store holds more than `max_bytes`.
+The filter, projection, sort and aggregate helpers run on stored rows, so
+follow-up questions never go back to Postgres.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Hashable, NamedTuple
+
+
+FILTER_OPS = ("=", "!=", "<", "<=", ">", ">=", "in", "not_in", "contains", "starts_with", "is_null", "not_null")
+AGGREGATES = ("count", "count_distinct", "sum", "avg", "min", "max")
+
+
+class StoredResult(NamedTuple):
+    handle: str
+    session: str
+    sql: str
+    headers: list[str]
+    rows: list[tuple]
+    truncated: bool
+    size: int
+
+
+class ResultStore:
+    """Thread-safe; `put` and `get` may be called from the DB worker threads."""
+
+    def __init__(self, ttl: float = 1800, max_bytes: int = 256 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # handle -> (expires_at, StoredResult)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stored = 0
+        self.evictions = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def _expire(self, now: float):
+        for handle in [h for h, (expires_at, _) in self.entries.items() if expires_at <= now]:
+            _, result = self.entries.pop(handle)
+            self.bytes -= result.size
+            self.expired += 1
+
+    def put(self, session: str, sql: str, headers: list[str], rows: list[tuple], truncated: bool, size: int) -> StoredResult | None:
+        """Store a result; None if it alone is over `max_bytes`."""
+        if size > self.max_bytes:
+            self.rejected += 1
+            return None
+        result = StoredResult("r" + secrets.token_hex(4), session, sql, headers, rows, truncated, size)
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            self.entries[result.handle] = (now + self.ttl, result)
+            self.bytes += size
+            self.stored += 1
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+        return result
+
+    def get(self, session: str, handle: str) -> StoredResult | None:
+        """The result, if it exists, belongs to `session` and has not expired; renews its TTL."""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self.entries.get(handle)
+            if entry is None or entry[1].session != session:
+                return None
+            self.entries[handle] = (now + self.ttl, entry[1])
+            self.entries.move_to_end(handle)
+            return entry[1]
+
+    def stats(self) -> dict:
+        with self.lock:
+            self._expire(time.monotonic())
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "stored": self.stored,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "rejected_too_large": self.rejected,
+            }
+
+
+def _number(value: Any) -> Decimal | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    try:
+        return Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _comparable(cell: Any, value: Any) -> tuple[Any, Any]:
+    """Bring a stored value and a JSON filter value to one comparable type."""
+    if isinstance(cell, (int, float, Decimal)) and not isinstance(cell, bool):
+        return _number(cell), _number(value)
+    if isinstance(cell, (datetime, date, dt_time)):
+        return cell.isoformat(sep=" ") if isinstance(cell, datetime) else cell.isoformat(), str(value)
+    return str(cell), str(value)
+
+
+def _matches(cell: Any, op: str, value: Any) -> bool:
+    if op == "is_null":
+        return cell is None
+    if op == "not_null":
+        return cell is not None
+    if cell is None:
+        return False
+    if op in ("in", "not_in"):
+        found = any(a == b for a, b in (_comparable(cell, v) for v in value))
+        return found if op == "in" else not found
+    a, b = _comparable(cell, value)
+    if b is None:
+        return op == "!="
+    if op == "contains":
+        return str(b).lower() in str(a).lower()
+    if op == "starts_with":
+        return str(a).lower().startswith(str(b).lower())
+    try:
+        return {
+            "=": a == b, "!=": a != b, "<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b,
+        }[op]
+    except TypeError:
+        return False
+
+
+def _column_index(headers: list[str], column: str) -> int:
+    try:
+        return headers.index(column)
+    except ValueError:
+        raise ValueError(f"unknown column '{column}', expected one of: {', '.join(headers)}")
+
+
+def filter_rows(headers: list[str], rows: list[tuple], filters: list[dict]) -> list[tuple]:
+    """Rows matching every {"column", "op", "value"} filter."""
+    checks = []
+    for f in filters:
+        op = f.get("op") or "="
+        if op not in FILTER_OPS:
+            raise ValueError(f"unknown filter op '{op}', expected one of: {', '.join(FILTER_OPS)}")
+        if op in ("in", "not_in") and not isinstance(f.get("value"), list):
+            raise ValueError(f"filter op '{op}' needs a list value")
+        checks.append((_column_index(headers, f.get("column")), op, f.get("value")))
+    return [r for r in rows if all(_matches(r[i], op, value) for i, op, value in checks)]
+
+
+def _sort_key(value: Any) -> tuple:
+    # NULLs last; numbers, then everything else as text
+    if value is None:
+        return (2, 0)
+    number = _number(value) if isinstance(value, (int, float, Decimal)) else None
+    return (0, number) if number is not None else (1, str(value))
+
+
+def sort_rows(headers: list[str], rows: list[tuple], column: str, descending: bool = False) -> list[tuple]:
+    i = _column_index(headers, column)
+    present = [r for r in rows if r[i] is not None]
+    missing = [r for r in rows if r[i] is None]
+    return sorted(present, key=lambda r: _sort_key(r[i]), reverse=descending) + missing
+
+
+def project(headers: list[str], rows: list[tuple], columns: list[str]) -> tuple[list[str], list[tuple]]:
+    indexes = [_column_index(headers, c) for c in columns]
+    return [headers[i] for i in indexes], [tuple(r[i] for i in indexes) for r in rows]
+
+
+def aggregate(
+    headers: list[str], rows: list[tuple], group_by: list[str], metrics: list[dict]
+) -> tuple[list[str], list[tuple]]:
+    """
+    GROUP BY `group_by` computing each {"op", "column"} metric; count
+    without a column counts rows. NULLs are skipped like in SQL, and like
+    SQL no `group_by` gives one row even for no rows (count 0, sum NULL).
+    """
+    keys = [_column_index(headers, c) for c in group_by]
+    specs = []
+    for m in metrics or [{"op": "count"}]:
+        op = m.get("op")
+        if op not in AGGREGATES:
+            raise ValueError(f"unknown aggregate '{op}', expected one of: {', '.join(AGGREGATES)}")
+        column = m.get("column")
+        if column is None and op != "count":
+            raise ValueError(f"aggregate '{op}' needs a column")
+        specs.append((op, None if column is None else _column_index(headers, column), f"{op}({column or '*'})"))
+
+    groups = {} if keys else {(): []}
+    for row in rows:
+        groups.setdefault(tuple(row[i] for i in keys), []).append(row)
+
+    out = []
+    for key, members in groups.items():
+        values = []
+        for op, i, _ in specs:
+            column = [r[i] for r in members] if i is not None else None
+            present = [v for v in column if v is not None] if column is not None else members
+            if op == "count":
+                values.append(len(present))
+            elif op == "count_distinct":
+                values.append(len({v if isinstance(v, Hashable) else repr(v) for v in present}))
+            elif op in ("min", "max"):
+                values.append((min if op == "min" else max)(present, key=_sort_key) if present else None)
+            else:
+                numbers = [n for n in map(_number, present) if n is not None]
+                total = sum(numbers, Decimal(0))
+                if not numbers:
+                    values.append(None)
+                else:
+                    values.append(total if op == "sum" else round(total / len(numbers), 6))
+        out.append(key + tuple(values))
+    return list(group_by) + [label for _, _, label in specs], out
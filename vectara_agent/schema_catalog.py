@@ -0,0 +1,363 @@
+"""
+In-memory snapshot of the Postgres catalog for the AML MCP server.
+
+Tables, columns, primary keys and foreign keys of every allowed schema are
+read once per refresh (four catalog queries per database) into indexed dicts, so the
+schema tools can answer without touching Postgres. A refresh builds a whole
+new snapshot and swaps it in, so readers never see a half-loaded catalog.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+from sqlalchemy import text
+
+from table_search import TableIndex
+
+
+logger = logging.getLogger("aml_postgres_mcp_server.catalog")
+
+
+class Column(NamedTuple):
+    column_name: str
+    data_type: str
+    is_nullable: str
+    column_default: str | None
+    comment: str | None
+
+
+class ForeignKey(NamedTuple):
+    table_schema: str
+    table_name: str
+    column_name: str
+    foreign_table_schema: str
+    foreign_table_name: str
+    foreign_column_name: str
+    constraint_name: str
+
+
+class Table(NamedTuple):
+    schema: str
+    name: str
+    kind: str
+    comment: str | None
+    columns: list[Column]
+    primary_key: tuple[str, ...] = ()
+
+
+_TABLES_SQL = text(
+    """
+    SELECT n.nspname AS schema_name, c.relname AS table_name, c.relkind AS kind,
+           obj_description(c.oid, 'pg_class') AS comment
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+      AND n.nspname = ANY(:schemas)
+    ORDER BY n.nspname, c.relname;
+    """
+)
+
+
+_COLUMNS_SQL = text(
+    """
+    SELECT
+        n.nspname AS schema_name,
+        c.relname AS table_name,
+        a.attname AS column_name,
+        pg_catalog.format_type(a.atttypid, a.atttypmod) AS data_type,
+        CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable,
+        pg_get_expr(ad.adbin, ad.adrelid) AS column_default,
+        d.description AS comment
+    FROM pg_attribute a
+    JOIN pg_class c ON a.attrelid = c.oid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_description d ON d.objoid = a.attrelid AND d.objsubid = a.attnum
+    LEFT JOIN pg_attrdef ad ON a.attrelid = ad.adrelid AND a.attnum = ad.adnum
+    WHERE n.nspname = ANY(:schemas)
+      AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY n.nspname, c.relname, a.attnum;
+    """
+)
+
+
+_PRIMARY_KEYS_SQL = text(
+    """
+    SELECT n.nspname AS schema_name, c.relname AS table_name, a.attname AS column_name
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, position)
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    WHERE con.contype = 'p'
+      AND n.nspname = ANY(:schemas)
+    ORDER BY n.nspname, c.relname, k.position;
+    """
+)
+
+
+# pg_constraint instead of the information_schema views: much faster, and
+# composite keys pair up column by column instead of as a cross product
+_FOREIGN_KEYS_SQL = text(
+    """
+    SELECT
+        n.nspname AS table_schema,
+        c.relname AS table_name,
+        a.attname AS column_name,
+        fn.nspname AS foreign_table_schema,
+        fc.relname AS foreign_table_name,
+        fa.attname AS foreign_column_name,
+        con.conname AS constraint_name
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_class fc ON fc.oid = con.confrelid
+    JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(attnum, fattnum)
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    JOIN pg_attribute fa ON fa.attrelid = con.confrelid AND fa.attnum = k.fattnum
+    WHERE con.contype = 'f'
+      AND n.nspname = ANY(:schemas)
+    ORDER BY c.relname, a.attname;
+    """
+)
+
+
+class JoinStep(NamedTuple):
+    """One hop of a join path: join `to_table` onto `from_table`."""
+
+    from_table: str
+    to_table: str
+    constraint_name: str
+    column_pairs: list[tuple[str, str]]  # (from_table column, to_table column)
+
+
+class CatalogSnapshot:
+    """One consistent, read-only view of the catalog."""
+
+    def __init__(self, tables: dict, foreign_keys: dict):
+        self.loaded_at = time.time()
+        self._tables = tables  # (schema, table) -> Table
+        self._by_schema = {}  # schema -> [Table] sorted by name
+        for table in sorted(tables.values(), key=lambda t: (t.schema, t.name)):
+            self._by_schema.setdefault(table.schema, []).append(table)
+        self._foreign_keys = foreign_keys  # schema -> [ForeignKey]
+
+    def tables(self, schema: str, kinds: str = "rp") -> list[Table]:
+        return [t for t in self._by_schema.get(schema, []) if t.kind in kinds]
+
+    def table(self, schema: str, name: str) -> Table | None:
+        return self._tables.get((schema, name))
+
+    def foreign_keys(self, schema: str) -> list[ForeignKey]:
+        return self._foreign_keys.get(schema, [])
+
+    def all_tables(self) -> list[Table]:
+        return [t for tables in self._by_schema.values() for t in tables]
+
+    def all_foreign_keys(self) -> list[ForeignKey]:
+        return [fk for fks in self._foreign_keys.values() for fk in fks]
+
+    def join_graph(self) -> dict:
+        """Undirected foreign-key graph: 'schema.table' -> [JoinStep], built on first use."""
+        if getattr(self, "_join_graph", None) is None:
+            constraints = {}
+            for fk in self.all_foreign_keys():
+                source = f"{fk.table_schema}.{fk.table_name}"
+                target = f"{fk.foreign_table_schema}.{fk.foreign_table_name}"
+                constraints.setdefault((source, target, fk.constraint_name), []).append(
+                    (fk.column_name, fk.foreign_column_name)
+                )
+            graph = {}
+            for (source, target, name), pairs in constraints.items():
+                graph.setdefault(source, []).append(JoinStep(source, target, name, pairs))
+                graph.setdefault(target, []).append(
+                    JoinStep(target, source, name, [(b, a) for a, b in pairs])
+                )
+            self._join_graph = graph
+        return self._join_graph
+
+    def search_index(self) -> TableIndex:
+        """BM25 index over table and column names and comments (find_tables), built on first use."""
+        if getattr(self, "_search_index", None) is None:
+            self._search_index = TableIndex(self.all_tables())
+        return self._search_index
+
+    def join_paths(self, source: str, target: str, max_hops: int = 4, max_paths: int = 5) -> list[list[JoinStep]]:
+        """
+        Shortest foreign-key join paths between two 'schema.table' names:
+        every path of the minimal hop count (at most `max_hops`), up to
+        `max_paths` of them. Two constraints between the same pair of
+        tables count as different paths.
+        """
+        graph = self.join_graph()
+        if source == target:
+            return [[]]
+        # BFS keeping every predecessor step that reaches a node at its shortest distance
+        distance = {source: 0}
+        predecessors = {}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target or distance[node] >= max_hops:
+                continue
+            for step in graph.get(node, []):
+                seen = distance.get(step.to_table)
+                if seen is None:
+                    distance[step.to_table] = distance[node] + 1
+                    queue.append(step.to_table)
+                    predecessors[step.to_table] = [step]
+                elif seen == distance[node] + 1:
+                    predecessors[step.to_table].append(step)
+        if target not in distance:
+            return []
+
+        paths = []
+
+        def walk(node, suffix):
+            if len(paths) >= max_paths:
+                return
+            if node == source:
+                paths.append(suffix)
+                return
+            for step in predecessors[node]:
+                walk(step.from_table, [step] + suffix)
+
+        walk(target, [])
+        return paths
+
+    def stats(self) -> dict:
+        return {
+            "loaded_at": self.loaded_at,
+            "schemas": len(self._by_schema),
+            "tables": len(self._tables),
+            "columns": sum(len(t.columns) for t in self._tables.values()),
+            "foreign_keys": sum(len(fks) for fks in self._foreign_keys.values()),
+            **(self._search_index.stats() if getattr(self, "_search_index", None) else {}),
+        }
+
+
+def _load_sqlite(conn, schemas, tables: dict, foreign_keys: dict):
+    """Catalog of the SQLite fixture backend (aml_fixture.py): one attached file per schema."""
+    for schema in schemas:
+        comments = {
+            (row[0], row[1]): row[2]
+            for row in conn.exec_driver_sql(f"SELECT table_name, column_name, comment FROM {schema}._comments")
+        }
+        relations = conn.exec_driver_sql(
+            f"SELECT name, type FROM {schema}.sqlite_master "
+            "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite%' AND name NOT LIKE '\\_%' ESCAPE '\\' "
+            "ORDER BY name"
+        ).fetchall()
+        for name, kind in relations:
+            info = conn.exec_driver_sql(f"PRAGMA {schema}.table_info('{name}')").fetchall()
+            columns = [
+                Column(
+                    row[1],
+                    (row[2] or "").lower(),
+                    "NO" if row[3] or row[5] else "YES",
+                    row[4],
+                    comments.get((name, row[1])),
+                )
+                for row in info
+            ]
+            # pk is the column's position in the primary key, 0 if not part of it
+            primary_key = tuple(row[1] for row in sorted(info, key=lambda row: row[5]) if row[5])
+            tables[(schema, name)] = Table(
+                schema, name, "r" if kind == "table" else "v", comments.get((name, None)), columns, primary_key
+            )
+
+            fks = {}
+            for row in conn.exec_driver_sql(f"PRAGMA {schema}.foreign_key_list('{name}')"):
+                fk_id, _, target, column, target_column = row[:5]
+                fks.setdefault(fk_id, []).append(
+                    ForeignKey(schema, name, column, schema, target, target_column, f"{name}_fk{fk_id}")
+                )
+            for fk_id in sorted(fks):
+                foreign_keys.setdefault(schema, []).extend(fks[fk_id])
+    for schema in schemas:
+        foreign_keys.get(schema, []).sort(key=lambda fk: (fk.table_name, fk.column_name))
+
+
+def load_snapshot(schemas_by_engine: dict) -> CatalogSnapshot:
+    """Read the catalog of the given schemas; `schemas_by_engine` maps engine -> [schema]."""
+    tables = {}
+    columns = {}
+    foreign_keys = {}
+    for engine, schemas in schemas_by_engine.items():
+        if engine.dialect.name == "sqlite":
+            with engine.connect() as conn:
+                _load_sqlite(conn, schemas, tables, foreign_keys)
+            continue
+        params = {"schemas": list(schemas)}
+        with engine.connect() as conn:
+            table_rows = conn.execute(_TABLES_SQL, params).fetchall()
+            column_rows = conn.execute(_COLUMNS_SQL, params).fetchall()
+            pk_rows = conn.execute(_PRIMARY_KEYS_SQL, params).fetchall()
+            fk_rows = conn.execute(_FOREIGN_KEYS_SQL, params).fetchall()
+
+        for row in column_rows:
+            columns.setdefault((row.schema_name, row.table_name), []).append(
+                Column(row.column_name, row.data_type, row.is_nullable, row.column_default, row.comment)
+            )
+        primary_keys = {}
+        for row in pk_rows:
+            primary_keys.setdefault((row.schema_name, row.table_name), []).append(row.column_name)
+        for row in table_rows:
+            key = (row.schema_name, row.table_name)
+            tables[key] = Table(
+                row.schema_name, row.table_name, row.kind, row.comment, columns.get(key, []),
+                tuple(primary_keys.get(key, ())),
+            )
+        for row in fk_rows:
+            foreign_keys.setdefault(row.table_schema, []).append(ForeignKey(*row))
+    return CatalogSnapshot(tables, foreign_keys)
+
+
+class SchemaCatalog:
+    """
+    Holds the current CatalogSnapshot. `snapshot` is None until the first
+    successful load; a failed refresh keeps serving the previous snapshot.
+    """
+
+    def __init__(self, schemas_by_engine: dict):
+        self.schemas_by_engine = schemas_by_engine
+        self.snapshot: CatalogSnapshot | None = None
+        self.lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_error: str | None = None
+        self.last_refresh_seconds: float | None = None
+
+    def refresh(self) -> CatalogSnapshot:
+        """Reload the whole catalog (blocking); concurrent calls run one at a time."""
+        with self.lock:
+            start = time.perf_counter()
+            try:
+                snapshot = load_snapshot(self.schemas_by_engine)
+            except Exception as e:
+                self.refresh_errors += 1
+                self.last_error = str(e)
+                logger.error(f"Catalog refresh failed: {e}")
+                raise
+            # Built before the swap, so no find_tables call pays for it
+            snapshot.search_index()
+            self.snapshot = snapshot
+            self.refreshes += 1
+            self.last_error = None
+            self.last_refresh_seconds = time.perf_counter() - start
+            logger.info(f"Catalog loaded in {self.last_refresh_seconds:.2f}s: {snapshot.stats()}")
+            return snapshot
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.snapshot is not None,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_error": self.last_error,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            **(self.snapshot.stats() if self.snapshot else {}),
+        }
@@ -0,0 +1,164 @@
+"""
+Minimal Prometheus text-format metrics for the AML MCP server.
+
+Counters and histograms are thread-safe (they are updated from the DB
+worker threads). Values owned by other objects, such as pool and cache
+sizes, are read at scrape time through collector callbacks.
+"""
+import math
+import threading
+import time
+from typing import Callable, Iterable
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            series = self.series.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self.lock:
+            items = sorted((labels, list(series)) for labels, series in self.series.items())
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {count}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(float(series[-2]))}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}"
+
+
+class MetricsRegistry:
+    """Renders registered metrics plus `collectors`: callables yielding (name, type, help, [(labels dict, value)])."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: tuple, labels: tuple = ()) -> Histogram:
+        metric = Histogram(name, help, buckets, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class SlowQueryLog:
+    """
+    Aggregates queries slower than `threshold` seconds by SQL fingerprint,
+    keeping the `max_entries` most recently seen fingerprints.
+    """
+
+    def __init__(self, threshold: float = 2, max_entries: int = 200):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.entries = {}  # fingerprint -> stats dict, oldest first
+        self.lock = threading.Lock()
+
+    def record(self, fingerprint: str, database: str, seconds: float, rows: int | None, error: str | None = None) -> bool:
+        """Add a query if it was slow; returns True if it was."""
+        if seconds < self.threshold:
+            return False
+        with self.lock:
+            entry = self.entries.pop(fingerprint, None) or {
+                "fingerprint": fingerprint,
+                "database": database,
+                "count": 0,
+                "errors": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+            }
+            entry["count"] += 1
+            entry["errors"] += 1 if error else 0
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["last_seconds"] = round(seconds, 3)
+            entry["last_rows"] = rows
+            entry["last_error"] = error
+            entry["last_seen"] = time.time()
+            self.entries[fingerprint] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+        return True
+
+    def top(self, limit: int = 50) -> list[dict]:
+        """Slowest fingerprints by total time spent."""
+        with self.lock:
+            entries = [dict(e) for e in self.entries.values()]
+        entries.sort(key=lambda e: e["total_seconds"], reverse=True)
+        for entry in entries:
+            entry["total_seconds"] = round(entry["total_seconds"], 3)
+            entry["max_seconds"] = round(entry["max_seconds"], 3)
+        return entries[:limit]
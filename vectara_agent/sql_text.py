@@ -0,0 +1,70 @@
+"""
+SQL text helpers: a light tokenizer that knows about quotes and comments,
+used to build cache keys and slow-query fingerprints.
+"""
+import re
+
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<string>'(?:[^']|'')*')        # 'literal', '' escapes a quote
+    | (?P<dollar>\$(?P<tag>\w*)\$.*?\$(?P=tag)\$)  # $tag$ literal $tag$
+    | (?P<ident>"(?:[^"]|"")*")         # "Quoted Identifier"
+    | (?P<comment>--[^\n]*|/\*.*?\*/)   # comments
+    | (?P<space>\s+)
+    | (?P<other>[^'"$\s/-]+|[$/-])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+_PUNCTUATION = set(",()=<>!+*/;")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical form of a query for cache keys: comments dropped, whitespace
+    collapsed (and removed next to punctuation), keywords and identifiers
+    lower-cased, trailing semicolons stripped. String literals (quoted or
+    dollar-quoted) and quoted identifiers are kept exactly, so queries that
+    differ in a value never share an entry.
+    """
+    out = []
+    pending_space = False
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        token = match.group()
+        if kind in ("space", "comment"):
+            pending_space = True
+            continue
+        if kind == "other":
+            token = token.lower()
+        if pending_space and out and out[-1][-1] not in _PUNCTUATION and token[0] not in _PUNCTUATION:
+            out.append(" ")
+        pending_space = False
+        out.append(token)
+    return "".join(out).rstrip(";")
+
+
+_NUMBER_RE = re.compile(r"(?<![\w.$])\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_VALUE_LIST_RE = re.compile(r"\(\?(?:,\?)+\)")
+
+
+def fingerprint_sql(sql: str) -> str:
+    """
+    Shape of a query with its values taken out: normalize_sql with every
+    string and number literal replaced by ? and (?,?,...) lists folded to
+    (?...), so the same query with different values groups together.
+    """
+    normalized = normalize_sql(sql)
+    out = []
+    for match in _TOKEN_RE.finditer(normalized):
+        kind = match.lastgroup
+        token = match.group()
+        if kind in ("string", "dollar"):
+            token = "?"
+        elif kind == "other":
+            token = _NUMBER_RE.sub("?", token)
+        out.append(token)
+    return _VALUE_LIST_RE.sub("(?...)", "".join(out))
+
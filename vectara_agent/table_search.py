@@ -0,0 +1,141 @@
+"""
+BM25 text index over the schema catalog, behind the find_tables tool.
+
+Every table is one document (schema and table name, table comment, column
+names and comments) and every column another (column name and comment,
+plus its table's name). Identifiers are split on underscores and the
+abbreviations common in these schemas (nm, cd, dttm, ...) expanded, so a
+free-text question like "when was the customer's account opened" reaches
+columns named like open_dttm. Names count twice, comments once.
+"""
+import math
+import re
+from collections import Counter
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_ABBREVIATIONS = {
+    "acct": "account",
+    "addr": "address",
+    "amt": "amount",
+    "cd": "code",
+    "cnt": "count",
+    "ctry": "country",
+    "cust": "customer",
+    "desc": "description",
+    "dt": "date",
+    "dttm": "date time",
+    "fdh": "financial data hub",
+    "id": "identifier",
+    "nm": "name",
+    "num": "number",
+    "qty": "quantity",
+    "svi": "visual investigator",
+    "tm": "transaction monitoring",
+    "txn": "transaction",
+}
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from has have how i in is it its me of on or show that the "
+    "their there these this to was were what when where which who whose why with".split()
+)
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str | None) -> list[str]:
+    tokens = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        for part in _ABBREVIATIONS.get(word, word).split():
+            if part not in _STOPWORDS:
+                tokens.append(_stem(part))
+    return tokens
+
+
+def first_line(text: str | None, width: int = 120) -> str:
+    line = (text or "").strip().splitlines()[0].strip() if (text or "").strip() else ""
+    return line if len(line) <= width else line[: width - 3].rstrip() + "..."
+
+
+class _BM25:
+    def __init__(self, documents: list[list[str]]):
+        self.lengths = [len(d) for d in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0
+        self.postings = {}  # term -> [(document, term frequency)]
+        for i, document in enumerate(documents):
+            for term, frequency in Counter(document).items():
+                self.postings.setdefault(term, []).append((i, frequency))
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def scores(self, terms: list[str]) -> dict[int, float]:
+        scores = {}
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, frequency in self.postings[term]:
+                norm = _K1 * (1 - _B + _B * self.lengths[i] / (self.average_length or 1))
+                scores[i] = scores.get(i, 0.0) + idf * frequency * (_K1 + 1) / (frequency + norm)
+        return scores
+
+
+class TableIndex:
+    """Built from a list of schema_catalog.Table; read-only afterwards."""
+
+    def __init__(self, tables: list):
+        self.tables = list(tables)
+        self.columns = [(table, column) for table in self.tables for column in table.columns]
+
+        table_documents = []
+        for table in self.tables:
+            names = tokenize(f"{table.schema} {table.name}")
+            document = names * 2 + tokenize(table.comment)
+            for column in table.columns:
+                document += tokenize(column.column_name) + tokenize(column.comment)
+            table_documents.append(document)
+        self._tables = _BM25(table_documents)
+
+        self._columns = _BM25([
+            tokenize(column.column_name) * 2 + tokenize(column.comment) + tokenize(table.name)
+            for table, column in self.columns
+        ])
+
+    def search(self, question: str, limit: int = 10, schemas: list[str] | None = None) -> tuple[list, list]:
+        """
+        Best matches for `question`: ([(score, Table)], [(score, Table, Column)]),
+        each at most `limit` long, optionally restricted to `schemas`.
+        """
+        terms = tokenize(question)
+        table_hits = [
+            (score, self.tables[i]) for i, score in self._tables.scores(terms).items()
+            if not schemas or self.tables[i].schema in schemas
+        ]
+        column_hits = [
+            (score, *self.columns[i]) for i, score in self._columns.scores(terms).items()
+            if not schemas or self.columns[i][0].schema in schemas
+        ]
+        table_hits.sort(key=lambda hit: (-hit[0], hit[1].schema, hit[1].name))
+        column_hits.sort(key=lambda hit: (-hit[0], hit[1].schema, hit[1].name, hit[2].column_name))
+        return table_hits[:limit], column_hits[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "indexed_tables": len(self.tables),
+            "indexed_columns": len(self.columns),
+            "index_terms": len(self._tables.postings),
+        }